@@ -0,0 +1,221 @@
+"""
+Материализованная сводка для дашборда администратора.
+
+dashboard_daily хранит по каждому специалисту и дню число записей по статусам,
+выручку (завершённые приёмы × Specialist.price) и загрузку слотов. Таблица
+догоняет очередь events по возрастанию id со своей позицией в consumer_offsets
+(events.status занят сервисом уведомлений): события appointment.* и
+schedule.changed дают набор затронутых пар (специалист, день), и только эти пары
+пересчитываются из appointments и schedules сгруппированными запросами.
+Позиция — outbox.EventCursor: вместе с последним id хранятся дыры ниже него,
+поэтому событие транзакции, закоммиченной позже событий с большими id, тоже
+будет прочитано. Пересчёт, запись сводки и сдвиг позиции идут в одной транзакции.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, delete, func, select, tuple_
+
+from models import Appointment, ConsumerOffset, DashboardDaily, Schedule, Specialist
+from outbox import EventCursor
+
+CONSUMER = "dashboard"
+CONSUMED_TOPICS = (
+    "appointment.created",
+    "appointment.status_changed",
+    "appointment.cancelled",
+    "schedule.changed",
+)
+STATUSES = ("pending", "confirmed", "completed", "cancelled")
+EVENTS_BATCH = 500
+# Ключей (специалист, день) в одном IN — дальше пересчёт идёт частями
+RECOUNT_CHUNK = 500
+
+
+def _lock_offset(session) -> ConsumerOffset | None:
+    """Позиция потребителя под блокировкой; None — её держит другой инстанс."""
+    stmt = select(ConsumerOffset).where(ConsumerOffset.consumer == CONSUMER)
+    offset = session.execute(stmt.with_for_update(skip_locked=True)).scalar_one_or_none()
+    if offset is None and session.get(ConsumerOffset, CONSUMER) is None:
+        offset = ConsumerOffset(consumer=CONSUMER, last_event_id=0, gaps={})
+        session.add(offset)
+        session.flush()
+    return offset
+
+
+def _touched_keys(session, events) -> set[tuple[int, date]]:
+    """Пары (специалист, день), которые затрагивают события пачки."""
+    keys: set[tuple[int, date]] = set()
+    undated: list[int] = []
+    for topic, payload in events:
+        sid = payload.get("specialist_id")
+        if sid is None:
+            continue
+        if topic == "schedule.changed":
+            day, last = date.fromisoformat(payload["date_from"]), date.fromisoformat(payload["date_to"])
+            while day <= last:
+                keys.add((int(sid), day))
+                day += timedelta(days=1)
+        elif payload.get("date"):
+            keys.add((int(sid), date.fromisoformat(payload["date"])))
+        elif payload.get("appointment_id"):
+            undated.append(int(payload["appointment_id"]))
+    # В старых событиях смены статуса нет даты — берём её из самой записи одним запросом
+    if undated:
+        keys.update(session.execute(
+            select(Appointment.specialist_id, Appointment.appointment_date).where(Appointment.id.in_(undated))
+        ).all())
+    return keys
+
+
+def _empty_row(key: tuple[int, date]) -> dict:
+    return {"specialist_id": key[0], "day": key[1], "revenue": 0,
+            "slots_total": 0, "slots_booked": 0, **{s: 0 for s in STATUSES}}
+
+
+def _aggregate(session, key_filter_apt, key_filter_slot) -> dict[tuple[int, date], dict]:
+    """Сводка из appointments и schedules по условию отбора пар (специалист, день)."""
+    rows: dict[tuple[int, date], dict] = {}
+
+    def row(key):
+        if key not in rows:
+            rows[key] = _empty_row(key)
+        return rows[key]
+
+    for sid, day, status, count in session.execute(
+        select(Appointment.specialist_id, Appointment.appointment_date, Appointment.status, func.count())
+        .where(key_filter_apt)
+        .group_by(Appointment.specialist_id, Appointment.appointment_date, Appointment.status)
+    ):
+        if status in STATUSES:
+            row((sid, day))[status] = count
+
+    for sid, day, total, booked in session.execute(
+        select(Schedule.specialist_id, Schedule.work_date, func.count(),
+               func.sum(case((Schedule.is_booked.is_(True), 1), else_=0)))
+        .where(key_filter_slot)
+        .group_by(Schedule.specialist_id, Schedule.work_date)
+    ):
+        item = row((sid, day))
+        item["slots_total"], item["slots_booked"] = total, int(booked or 0)
+
+    specialist_ids = {sid for sid, _ in rows}
+    if specialist_ids:
+        prices = dict(session.execute(
+            select(Specialist.id, Specialist.price).where(Specialist.id.in_(specialist_ids))
+        ).all())
+        for (sid, _), item in rows.items():
+            item["revenue"] = item["completed"] * (prices.get(sid) or 0)
+    return rows
+
+
+def _upsert(session, rows: list[dict]) -> None:
+    if not rows:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    now = datetime.utcnow()
+    for start in range(0, len(rows), RECOUNT_CHUNK):
+        stmt = insert(DashboardDaily).values([{**r, "updated_at": now} for r in rows[start:start + RECOUNT_CHUNK]])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["specialist_id", "day"],
+            set_={col: stmt.excluded[col]
+                  for col in (*STATUSES, "revenue", "slots_total", "slots_booked", "updated_at")},
+        ))
+
+
+def recount(session, keys: set[tuple[int, date]]) -> int:
+    """Пересчитывает строки сводки для заданных пар (специалист, день); пустые дни обнуляются."""
+    ordered = sorted(keys)
+    for start in range(0, len(ordered), RECOUNT_CHUNK):
+        chunk = ordered[start:start + RECOUNT_CHUNK]
+        rows = _aggregate(
+            session,
+            tuple_(Appointment.specialist_id, Appointment.appointment_date).in_(chunk),
+            tuple_(Schedule.specialist_id, Schedule.work_date).in_(chunk),
+        )
+        for key in chunk:
+            rows.setdefault(key, _empty_row(key))
+        _upsert(session, list(rows.values()))
+    return len(ordered)
+
+
+def catch_up(session, max_batches: int) -> dict:
+    """
+    Обрабатывает до max_batches пачек событий после позиции потребителя,
+    каждая пачка — отдельная транзакция. Если позицию держит другой инстанс, ничего не делает.
+    """
+    applied, recounted = 0, 0
+    for _ in range(max_batches):
+        offset = _lock_offset(session)
+        if offset is None:
+            break
+        cursor = EventCursor(offset.last_event_id, offset.gaps)
+        events = cursor.fetch(session, EVENTS_BATCH)
+        consumed = [(topic, payload) for _, topic, payload in events if topic in CONSUMED_TOPICS]
+        if consumed:
+            recounted += recount(session, _touched_keys(session, consumed))
+        cursor.advance([evt_id for evt_id, _, _ in events])
+        state = cursor.state()
+        offset.last_event_id, offset.gaps = state["last_event_id"], state["gaps"]
+        offset.updated_at = datetime.utcnow()
+        session.commit()
+        applied += len(consumed)
+        if len(events) < EVENTS_BATCH:
+            break
+    offset = session.get(ConsumerOffset, CONSUMER)
+    return {"events": applied, "recounted": recounted,
+            "last_event_id": offset.last_event_id if offset else 0,
+            "pending_gaps": len(offset.gaps or {}) if offset else 0}
+
+
+def rebuild(session, date_from: date, date_to: date) -> int:
+    """
+    Полный пересчёт сводки за период из appointments и schedules.
+    Позиция очереди не сдвигается: события периода, прочитанные позже, лишь пересчитают те же дни.
+    """
+    rows = _aggregate(
+        session,
+        Appointment.appointment_date.between(date_from, date_to),
+        Schedule.work_date.between(date_from, date_to),
+    )
+    session.execute(
+        delete(DashboardDaily).where(DashboardDaily.day.between(date_from, date_to))
+        .execution_options(synchronize_session=False)
+    )
+    _upsert(session, list(rows.values()))
+    session.commit()
+    return len(rows)
+
+
+def read_dashboard(session, date_from: date, date_to: date, specialist_id: int | None = None) -> dict:
+    """Сводка за период: строки по специалистам и дням и итоги, без обращения к appointments."""
+    stmt = (
+        select(DashboardDaily, Specialist.name, Specialist.specialty)
+        .join(Specialist, Specialist.id == DashboardDaily.specialist_id)
+        .where(DashboardDaily.day.between(date_from, date_to))
+        .order_by(DashboardDaily.day, DashboardDaily.specialist_id)
+    )
+    if specialist_id is not None:
+        stmt = stmt.where(DashboardDaily.specialist_id == specialist_id)
+
+    totals = {"revenue": 0, "slots_total": 0, "slots_booked": 0, **{s: 0 for s in STATUSES}}
+    days = []
+    for item, name, specialty in session.execute(stmt):
+        entry = {
+            "date": item.day.isoformat(),
+            "specialist_id": item.specialist_id,
+            "doctor": name,
+            "specialty": specialty,
+            **{s: getattr(item, s) for s in STATUSES},
+            "revenue": item.revenue,
+            "slots_total": item.slots_total,
+            "slots_booked": item.slots_booked,
+            "occupancy": round(item.slots_booked / item.slots_total, 3) if item.slots_total else None,
+        }
+        for field in totals:
+            totals[field] += entry[field]
+        days.append(entry)
+    totals["occupancy"] = round(totals["slots_booked"] / totals["slots_total"], 3) if totals["slots_total"] else None
+    return {"rows": days, "totals": totals}
@@ -7,19 +7,48 @@
   GET /                    — записи на сегодня
   GET /?date=YYYY-MM-DD    — записи на дату
   GET /?id=N               — одна запись
-  POST /                   — создать запись (публикует событие appointment.created)
+  GET /?action=export&from=&to=[&specialist_id=&format=csv|ndjson&cursor=]
+                           — выгрузка записей за период страницами (курсор в X-Next-Cursor)
+  POST /                   — создать запись (публикует событие appointment.created);
+                             заголовок Idempotency-Key повторяет сохранённый ответ
   PUT /?id=N               — обновить статус (публикует событие appointment.status_changed)
+  PUT /                    — массово сменить статус {ids, status} одним UPDATE ... RETURNING
   DELETE /?id=N            — отменить запись (публикует событие appointment.cancelled)
+  POST /?action=hold       — удержать слот на N минут {specialist_id, date, time, minutes}
+  DELETE /?action=hold&token=T — снять удержание
+  POST /?action=sweep_holds — массово снять истёкшие удержания и удалить истёкшие
+                             ключи идемпотентности (пачками)
+  POST /?action=maintain_partitions — создать будущие месячные партиции, архивировать старые
+  POST /?action=waitlist   — встать в лист ожидания {specialist_id, patient_name, patient_phone,
+                             date_from, date_to, time_from, time_to}; при освобождении слота
+                             в окне сервис уведомлений отправит предложение
+  DELETE /?action=waitlist&id=N — выйти из листа ожидания
+  GET /?action=dashboard&from=&to=[&specialist_id=] — сводка по дням из dashboard_daily
+                             (перед чтением догоняет очередь событий)
+  POST /?action=dashboard_rebuild {from, to} — пересчитать сводку за период из таблиц
+
+С подписанным токеном врача (X-Auth-Token при AUTH_TOKEN_MODE=signed) список записей
+и дашборд ограничиваются его специалистом; токен проверяется локально (tokens.py),
+без запроса в сервис авторизации.
 """
+import csv
+import hashlib
+import io
 import json
 import logging
+import secrets
 
-from datetime import date as date_type, datetime
+from datetime import date as date_type, datetime, time as time_type, timedelta
+from sqlalchemy import delete, insert, or_, select, text, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm import joinedload
 
-from models import Appointment, Schedule, Specialist, Event, get_session
-from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS
+from dashboard import catch_up, read_dashboard, rebuild as rebuild_dashboard
+from models import (
+    SCHEMA, Appointment, Schedule, Specialist, Event, IdempotencyKey, WaitlistEntry, get_session
+)
+from tokens import RevocationList, verify_request_token
+from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS, TTLCache
 
 logger = setup_logger("appointments")
 
@@ -28,6 +57,41 @@ TOPIC_STATUS = "appointment.status_changed"
 TOPIC_CANCELLED = "appointment.cancelled"
 SERVICE_NAME = "appointments"
 
+ALLOWED_STATUSES = {"pending", "confirmed", "cancelled", "completed"}
+MAX_BULK_IDS = 500
+
+EXPORT_COLUMNS = ["id", "date", "time", "status", "patient", "phone", "comment",
+                  "specialist_id", "doctor", "specialty"]
+# Страница выгрузки целиком уходит в теле ответа функции — держим её заметно
+# меньше лимита платформы на размер ответа; продолжение — по X-Next-Cursor
+EXPORT_PAGE_ROWS = 5000
+EXPORT_PAGE_BYTES = 2 * 1024 * 1024
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+PARTITION_MONTHS_AHEAD = 3
+# Партиции создаются в цикле под advisory-блокировкой — горизонт ограничен
+PARTITION_MONTHS_AHEAD_MAX = 24
+_partitions_checked_on: date_type | None = None
+
+HOLD_DEFAULT_MINUTES = 10
+HOLD_MAX_MINUTES = 30
+
+IDEMPOTENCY_TTL_HOURS = 24
+IDEMPOTENCY_PURGE_BATCH = 1000
+IDEMPOTENCY_PURGE_MAX_BATCHES = 20
+
+WAITLIST_MAX_DAYS = 90
+
+DASHBOARD_MAX_DAYS = 92
+# Сколько пачек событий дашборд дочитывает на запросе; остальное — следующим запросом
+DASHBOARD_CATCHUP_BATCHES = 4
+# LRU перед таблицей idempotency_keys: повтор на тёплом инстансе не ходит в БД
+_idempotency_cache = TTLCache(maxsize=2048, ttl=IDEMPOTENCY_TTL_HOURS * 3600)
+_revocations = RevocationList()
+
 
 def _publish_event(session, topic: str, payload: dict) -> None:
     """Публикует событие в очередь (Transactional Outbox)."""
@@ -36,6 +100,261 @@ def _publish_event(session, topic: str, payload: dict) -> None:
     logger.info(f"Event published: topic={topic} payload={payload}")
 
 
+def _publish_events(session, topic: str, payloads: list[dict]) -> None:
+    """Публикует пачку событий одним multi-row INSERT."""
+    if not payloads:
+        return
+    session.execute(insert(Event).values([
+        {"topic": topic, "payload": p, "produced_by": SERVICE_NAME, "status": "pending"}
+        for p in payloads
+    ]))
+    logger.info(f"Events published: topic={topic} count={len(payloads)}")
+
+
+def _doctor_specialist_id(event: dict, session) -> int | None:
+    """Специалист из подписанного токена врача; None — токена нет, он не подписанный или не врача."""
+    claims = verify_request_token(event, session, _revocations)
+    if claims and claims.get("role") == "doctor" and claims.get("spec"):
+        return int(claims["spec"])
+    return None
+
+
+def _idempotency_key(event: dict) -> str | None:
+    headers = event.get("headers") or {}
+    return headers.get("Idempotency-Key") or headers.get("idempotency-key")
+
+
+def _replay_idempotent(session, key: str, request_hash: str) -> dict | None:
+    """Возвращает сохранённый ответ для повторного запроса или None."""
+    cached = _idempotency_cache.get(key)
+    if cached is None:
+        row = (
+            session.query(IdempotencyKey)
+            .filter_by(key=key)
+            .filter(IdempotencyKey.expires_at > datetime.utcnow())
+            .first()
+        )
+        if not row:
+            return None
+        cached = (row.request_hash, row.status_code, row.response_body)
+        ttl = (row.expires_at - datetime.utcnow()).total_seconds()
+        _idempotency_cache.set(key, cached, ttl=ttl)
+
+    stored_hash, status_code, response_body = cached
+    if stored_hash != request_hash:
+        return error("Idempotency-Key уже использован с другим телом запроса", status=422)
+
+    logger.info(f"Idempotent replay key={key[:16]}")
+    return {
+        "statusCode": status_code,
+        "headers": {**CORS_HEADERS, "Idempotent-Replayed": "true"},
+        "body": response_body,
+    }
+
+
+def _store_idempotent(session, key: str, request_hash: str, response: dict) -> None:
+    """Сохраняет ответ под ключом в текущей транзакции (вместе с самой записью)."""
+    now = datetime.utcnow()
+    # Истёкший ключ с тем же значением освобождаем, иначе сработает UNIQUE
+    (
+        session.query(IdempotencyKey)
+        .filter_by(key=key)
+        .filter(IdempotencyKey.expires_at <= now)
+        .delete(synchronize_session=False)
+    )
+    session.add(IdempotencyKey(
+        key=key,
+        request_hash=request_hash,
+        status_code=response["statusCode"],
+        response_body=response["body"],
+        expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+    ))
+
+
+def _purge_expired_idempotency_keys(session) -> tuple[int, bool]:
+    """
+    Удаляет истёкшие ключи идемпотентности пачками, каждая пачка — своя транзакция.
+    Возвращает число удалённых строк и признак, что истёкшие ещё остались.
+    """
+    deleted = 0
+    for _ in range(IDEMPOTENCY_PURGE_MAX_BATCHES):
+        ids = (
+            select(IdempotencyKey.id)
+            .where(IdempotencyKey.expires_at < datetime.utcnow())
+            .limit(IDEMPOTENCY_PURGE_BATCH)
+            .with_for_update(skip_locked=True)
+        )
+        removed = session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        deleted += removed
+        if removed < IDEMPOTENCY_PURGE_BATCH:
+            return deleted, False
+    return deleted, True
+
+
+def _export_rows(session, date_from, date_to, specialist_id: int | None, after: tuple | None) -> list[dict]:
+    """Одна страница выгрузки (не больше EXPORT_PAGE_ROWS строк), без создания ORM-объектов."""
+    stmt = (
+        select(
+            Appointment.id, Appointment.appointment_date, Appointment.appointment_time,
+            Appointment.status, Appointment.patient_name, Appointment.patient_phone,
+            Appointment.patient_comment, Appointment.specialist_id,
+            Specialist.name, Specialist.specialty,
+        )
+        .outerjoin(Specialist, Specialist.id == Appointment.specialist_id)
+        .where(Appointment.appointment_date.between(date_from, date_to))
+        .order_by(Appointment.appointment_date, Appointment.appointment_time, Appointment.id)
+        .limit(EXPORT_PAGE_ROWS)
+    )
+    if specialist_id:
+        stmt = stmt.where(Appointment.specialist_id == specialist_id)
+    if after:
+        stmt = stmt.where(
+            tuple_(Appointment.appointment_date, Appointment.appointment_time, Appointment.id) > after
+        )
+    return [
+        {
+            "id": row[0],
+            "date": row[1].isoformat(),
+            "time": row[2].strftime("%H:%M"),
+            "status": row[3],
+            "patient": row[4],
+            "phone": row[5],
+            "comment": row[6] or "",
+            "specialist_id": row[7],
+            "doctor": row[8],
+            "specialty": row[9],
+        }
+        for row in session.execute(stmt)
+    ]
+
+
+def _encode_export_page(rows: list[dict], fmt: str, with_header: bool) -> tuple[str, int]:
+    """
+    Кодирует страницу в CSV или NDJSON, пока тело в UTF-8 укладывается в EXPORT_PAGE_BYTES
+    (хотя бы одна строка входит всегда). Возвращает тело и число вошедших строк —
+    по последней из них строится курсор.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    if fmt == "csv" and with_header:
+        buf.write("\ufeff")  # BOM — чтобы Excel открыл кириллицу
+        writer.writeheader()
+    parts = [buf.getvalue()]
+    # Лимит ответа — в байтах, а кириллица в UTF-8 занимает два байта на символ
+    size = len(parts[0].encode("utf-8"))
+    written = 0
+    for row in rows:
+        if fmt == "csv":
+            buf.seek(0)
+            buf.truncate()
+            writer.writerow(row)
+            line = buf.getvalue()
+        else:
+            line = json.dumps(row, ensure_ascii=False) + "\n"
+        line_bytes = len(line.encode("utf-8"))
+        if written and size + line_bytes > EXPORT_PAGE_BYTES:
+            break
+        parts.append(line)
+        size += line_bytes
+        written += 1
+    return "".join(parts), written
+
+
+def _parse_export_cursor(cursor: str) -> tuple:
+    raw_date, raw_time, raw_id = cursor.split("|")
+    return date_type.fromisoformat(raw_date), time_type.fromisoformat(raw_time), int(raw_id)
+
+
+def _is_postgres(session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _ensure_partitions(session, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """Создаёт недостающие месячные партиции appointments (отдельной транзакцией)."""
+    created = session.execute(
+        text(f"SELECT {SCHEMA}.ensure_appointment_partitions(:months)"),
+        {"months": months_ahead},
+    ).scalar()
+    session.commit()
+    if created:
+        logger.info(f"Created {created} appointment partitions")
+    return created
+
+
+def _ensure_partitions_daily(session) -> None:
+    """
+    Раз в сутки на процесс проверяет, что партиции на ближайшие месяцы существуют.
+    Одновременные вызовы с разных инстансов сериализует advisory-блокировка внутри функции БД.
+    """
+    global _partitions_checked_on
+    today = date_type.today()
+    if _partitions_checked_on == today or not _is_postgres(session):
+        return
+    _ensure_partitions(session)
+    _partitions_checked_on = today
+
+
+def _not_held(now: datetime):
+    """Условие «слот никем не удерживается» (нет удержания или оно истекло)."""
+    return or_(Schedule.held_until.is_(None), Schedule.held_until <= now)
+
+
+def _acquire_hold(session, specialist_id: int, work_date, slot_time, minutes: int) -> tuple[str, datetime] | None:
+    """
+    Удерживает свободный слот одним условным UPDATE ... RETURNING.
+    Из конкурирующих запросов строку получает только один, остальные — None.
+    """
+    now = datetime.utcnow()
+    token = secrets.token_hex(16)
+    held_until = now + timedelta(minutes=minutes)
+    stmt = (
+        update(Schedule)
+        .where(
+            Schedule.specialist_id == specialist_id,
+            Schedule.work_date == work_date,
+            Schedule.slot_time == slot_time,
+            Schedule.is_booked.is_(False),
+            _not_held(now),
+        )
+        .values(hold_token=token, held_until=held_until)
+        .returning(Schedule.id)
+        .execution_options(synchronize_session=False)
+    )
+    if session.execute(stmt).first() is None:
+        return None
+    return token, held_until
+
+
+def _bulk_update_status(session, ids: list[int], new_status: str) -> list[dict]:
+    """
+    Меняет статус пачки записей одним UPDATE ... FROM ... RETURNING.
+    Подзапрос с FOR UPDATE блокирует строки и отдаёт старый статус
+    из снимка до обновления; записи уже в целевом статусе не трогаются.
+    """
+    old = (
+        select(Appointment.id, Appointment.status)
+        .where(Appointment.id.in_(ids), Appointment.status != new_status)
+        .with_for_update()
+        .subquery("old")
+    )
+    stmt = (
+        update(Appointment)
+        .where(Appointment.id == old.c.id)
+        .values(status=new_status)
+        .returning(Appointment.id, Appointment.specialist_id, Appointment.patient_name,
+                   Appointment.appointment_date, old.c.status)
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        {"appointment_id": apt_id, "specialist_id": specialist_id, "patient_name": patient_name,
+         "date": apt_date.isoformat(), "old_status": old_status, "new_status": new_status}
+        for apt_id, specialist_id, patient_name, apt_date, old_status in session.execute(stmt).all()
+    ]
+
+
 def handler(event: dict, context) -> dict:
     """Обработчик микросервиса записей на приём."""
 
@@ -51,6 +370,56 @@ def handler(event: dict, context) -> dict:
     try:
         session = get_session()
 
+        # GET — выгрузка за период
+        if method == "GET" and params.get("action") == "export":
+            fmt = params.get("format", "csv")
+            if fmt not in EXPORT_CONTENT_TYPES:
+                return error("Параметр format должен быть csv или ndjson")
+            if not params.get("from") or not params.get("to"):
+                return error("Параметры from и to обязательны")
+            try:
+                date_from = date_type.fromisoformat(params["from"])
+                date_to = date_type.fromisoformat(params["to"])
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            try:
+                after = _parse_export_cursor(params["cursor"]) if params.get("cursor") else None
+            except ValueError:
+                return error("Некорректный cursor")
+            specialist_id = int(params["specialist_id"]) if params.get("specialist_id") else None
+
+            rows = _export_rows(session, date_from, date_to, specialist_id, after)
+            body, written = _encode_export_page(rows, fmt, with_header=after is None)
+
+            headers = {
+                **CORS_HEADERS,
+                "Content-Type": EXPORT_CONTENT_TYPES[fmt],
+                "Content-Disposition": f'attachment; filename="appointments_{date_from}_{date_to}.{fmt}"',
+                "Access-Control-Expose-Headers": "X-Next-Cursor, Content-Disposition",
+            }
+            if written < len(rows) or len(rows) == EXPORT_PAGE_ROWS:
+                r = rows[written - 1]
+                headers["X-Next-Cursor"] = f"{r['date']}|{r['time']}|{r['id']}"
+            logger.info(f"Export {fmt} {date_from}..{date_to}: {written} rows")
+            return {"statusCode": 200, "headers": headers, "body": body}
+
+        # GET — сводка для дашборда администратора
+        if method == "GET" and params.get("action") == "dashboard":
+            try:
+                date_from = date_type.fromisoformat(params["from"]) if params.get("from") else date_type.today()
+                date_to = date_type.fromisoformat(params["to"]) if params.get("to") else date_from
+                specialist_id = int(params["specialist_id"]) if params.get("specialist_id") else None
+            except ValueError:
+                return error("Неверный формат параметров. Ожидается from/to — YYYY-MM-DD, specialist_id — число")
+            if date_to < date_from or (date_to - date_from).days >= DASHBOARD_MAX_DAYS:
+                return error(f"Период должен быть от 1 до {DASHBOARD_MAX_DAYS} дней")
+
+            specialist_id = _doctor_specialist_id(event, session) or specialist_id
+            synced = catch_up(session, DASHBOARD_CATCHUP_BATCHES)
+            summary = read_dashboard(session, date_from, date_to, specialist_id)
+            return ok({"from": date_from.isoformat(), "to": date_to.isoformat(), **summary,
+                       "last_event_id": synced["last_event_id"]})
+
         # GET
         if method == "GET":
             apt_id = params.get("id")
@@ -77,18 +446,172 @@ def handler(event: dict, context) -> dict:
             else:
                 target_date = date_type.today()
 
-            appointments = (
+            query = (
                 session.query(Appointment)
                 .options(joinedload(Appointment.specialist))
                 .filter_by(appointment_date=target_date)
-                .order_by(Appointment.appointment_time)
-                .all()
             )
+            doctor_specialist_id = _doctor_specialist_id(event, session)
+            if doctor_specialist_id:
+                query = query.filter_by(specialist_id=doctor_specialist_id)
+            appointments = query.order_by(Appointment.appointment_time).all()
             logger.info(f"Appointments for {target_date}: {len(appointments)} records")
             return ok({"appointments": [a.to_dict() for a in appointments]})
 
+        # POST — удержать слот до подтверждения записи
+        if method == "POST" and params.get("action") == "hold":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+
+            required = ["specialist_id", "date", "time"]
+            missing = [f for f in required if not body.get(f)]
+            if missing:
+                return error(f"Отсутствуют обязательные поля: {', '.join(missing)}")
+
+            try:
+                hold_date = date_type.fromisoformat(str(body["date"]))
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            try:
+                hold_time = time_type.fromisoformat(str(body["time"]))
+            except ValueError:
+                return error("Неверный формат времени. Ожидается HH:MM")
+            try:
+                minutes = int(body.get("minutes", HOLD_DEFAULT_MINUTES))
+            except (ValueError, TypeError):
+                return error("Поле minutes должно быть целым числом")
+            minutes = min(HOLD_MAX_MINUTES, max(1, minutes))
+
+            hold = _acquire_hold(session, int(body["specialist_id"]), hold_date, hold_time, minutes)
+            if not hold:
+                session.rollback()
+                return error("Выбранное время недоступно или уже занято", status=409)
+            session.commit()
+
+            token, held_until = hold
+            logger.info(f"Hold specialist={body['specialist_id']} {hold_date} {hold_time} for {minutes} min")
+            return ok({"hold_token": token, "expires_at": held_until.isoformat()}, status=201)
+
+        # POST — встать в лист ожидания
+        if method == "POST" and params.get("action") == "waitlist":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+
+            required = ["specialist_id", "patient_name", "patient_phone", "date_from", "date_to"]
+            missing = [f for f in required if not body.get(f)]
+            if missing:
+                return error(f"Отсутствуют обязательные поля: {', '.join(missing)}")
+            try:
+                date_from = date_type.fromisoformat(str(body["date_from"]))
+                date_to = date_type.fromisoformat(str(body["date_to"]))
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            try:
+                time_from = time_type.fromisoformat(body["time_from"]) if body.get("time_from") else None
+                time_to = time_type.fromisoformat(body["time_to"]) if body.get("time_to") else None
+            except ValueError:
+                return error("Неверный формат времени. Ожидается HH:MM")
+            if date_to < date_from or date_to < date_type.today():
+                return error("Окно дат должно быть в будущем, date_to не раньше date_from")
+            if (date_to - date_from).days >= WAITLIST_MAX_DAYS:
+                return error(f"Окно дат не может превышать {WAITLIST_MAX_DAYS} дней")
+            if time_from and time_to and time_to < time_from:
+                return error("Время time_to не может быть раньше time_from")
+
+            specialist = session.get(Specialist, int(body["specialist_id"]))
+            if not specialist:
+                return error("Специалист не найден", status=404)
+
+            entry = WaitlistEntry(
+                specialist_id=specialist.id,
+                patient_name=str(body["patient_name"])[:200],
+                patient_phone=str(body["patient_phone"])[:50],
+                date_from=max(date_from, date_type.today()),
+                date_to=date_to,
+                time_from=time_from,
+                time_to=time_to,
+                status="active",
+            )
+            session.add(entry)
+            session.commit()
+            logger.info(f"Waitlist entry id={entry.id} specialist={specialist.id} {entry.date_from}..{date_to}")
+            return ok({"waitlist": entry.to_dict()}, status=201)
+
+        # POST — пересчитать сводку дашборда за период
+        if method == "POST" and params.get("action") == "dashboard_rebuild":
+            try:
+                body = json.loads(event.get("body") or "{}")
+                date_from = date_type.fromisoformat(body["from"])
+                date_to = date_type.fromisoformat(body["to"])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                return error("Ожидается JSON {from, to} с датами YYYY-MM-DD")
+            if date_to < date_from:
+                return error("Дата to раньше from")
+            # Пересчёт идёт одной транзакцией — период ограничен так же, как чтение сводки
+            if (date_to - date_from).days >= DASHBOARD_MAX_DAYS:
+                return error(f"Период должен быть от 1 до {DASHBOARD_MAX_DAYS} дней")
+
+            rows = rebuild_dashboard(session, date_from, date_to)
+            logger.info(f"Dashboard rebuilt {date_from}..{date_to}: {rows} rows")
+            return ok({"rebuilt": rows})
+
+        # POST — массово снять истёкшие удержания
+        if method == "POST" and params.get("action") == "sweep_holds":
+            result = session.execute(
+                update(Schedule)
+                .where(Schedule.held_until <= datetime.utcnow())
+                .values(hold_token=None, held_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            # Таблица idempotency_keys иначе только растёт: TTL есть лишь у кэша в памяти
+            purged, has_more = _purge_expired_idempotency_keys(session)
+            logger.info(f"Swept {result.rowcount} expired holds, purged {purged} idempotency keys, has_more={has_more}")
+            return ok({"swept": result.rowcount, "purged_idempotency_keys": purged, "has_more": has_more})
+
+        # POST — обслуживание партиций appointments
+        if method == "POST" and params.get("action") == "maintain_partitions":
+            if not _is_postgres(session):
+                return error("Партиционирование поддерживается только в PostgreSQL", status=501)
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+
+            try:
+                months_ahead = min(PARTITION_MONTHS_AHEAD_MAX,
+                                   max(1, int(body.get("months_ahead", PARTITION_MONTHS_AHEAD))))
+                archive_before = body.get("archive_before")
+                archive_before = date_type.fromisoformat(archive_before) if archive_before else None
+            except (ValueError, TypeError):
+                return error("Ожидается months_ahead — целое число, archive_before — YYYY-MM-DD")
+
+            created = _ensure_partitions(session, months_ahead)
+            archived = 0
+            if archive_before:
+                archived = session.execute(
+                    text(f"SELECT {SCHEMA}.archive_appointment_partitions(:before)"),
+                    {"before": archive_before},
+                ).scalar()
+                session.commit()
+            logger.info(f"Partitions maintenance: created={created} archived={archived}")
+            return ok({"created": created, "archived": archived})
+
         # POST — создать запись
         if method == "POST":
+            idem_key = _idempotency_key(event)
+            request_hash = hashlib.sha256((event.get("body") or "").encode()).hexdigest()
+            if idem_key:
+                if len(idem_key) > 255:
+                    return error("Заголовок Idempotency-Key не длиннее 255 символов")
+                replay = _replay_idempotent(session, idem_key, request_hash)
+                if replay:
+                    return replay
+
             try:
                 body = json.loads(event.get("body") or "{}")
             except json.JSONDecodeError:
@@ -104,22 +627,40 @@ def handler(event: dict, context) -> dict:
             except ValueError:
                 return error("Неверный формат даты. Ожидается YYYY-MM-DD")
 
+            try:
+                apt_time = time_type.fromisoformat(str(body["time"]))
+            except ValueError:
+                return error("Неверный формат времени. Ожидается HH:MM")
+
+            _ensure_partitions_daily(session)
+
             spec = session.get(Specialist, int(body["specialist_id"]))
             if not spec:
                 return error("Специалист не найден", status=404)
 
-            # Проверяем слот
-            slot = (
+            # Проверяем слот: свой действующий hold или никем не удерживаемый свободный
+            now = datetime.utcnow()
+            slot_query = (
                 session.query(Schedule)
                 .filter_by(
                     specialist_id=int(body["specialist_id"]),
                     work_date=apt_date,
                     is_booked=False,
                 )
-                .filter(Schedule.slot_time == body["time"])
-                .first()
+                .filter(Schedule.slot_time == apt_time)
             )
+            hold_token = body.get("hold_token")
+            if hold_token:
+                slot_query = slot_query.filter(
+                    Schedule.hold_token == str(hold_token),
+                    Schedule.held_until > now,
+                )
+            else:
+                slot_query = slot_query.filter(_not_held(now))
+            slot = slot_query.with_for_update().first()
             if not slot:
+                if hold_token:
+                    return error("Удержание слота истекло или не найдено", status=409)
                 return error("Выбранное время недоступно или уже занято", status=409)
 
             # Создаём запись
@@ -129,50 +670,88 @@ def handler(event: dict, context) -> dict:
                 patient_phone=str(body["patient_phone"])[:50],
                 patient_comment=str(body.get("patient_comment", ""))[:1000] or None,
                 appointment_date=apt_date,
-                appointment_time=body["time"],
+                appointment_time=apt_time,
                 status="pending",
             )
+            apt.specialist = spec
             session.add(apt)
 
-            # Помечаем слот занятым
+            # Помечаем слот занятым и снимаем удержание
             slot.is_booked = True
+            slot.hold_token = None
+            slot.held_until = None
+
+            # flush выдаёт id до commit — событие и ответ пишутся в той же транзакции
+            session.flush()
 
             # Публикуем событие в очередь (Outbox → notifications прочитает)
             _publish_event(session, TOPIC_CREATED, {
-                "appointment_id": None,  # обновим после commit
+                "appointment_id": apt.id,
+                "specialist_id": spec.id,
                 "patient_name": apt.patient_name,
                 "patient_phone": apt.patient_phone,
                 "specialist_name": spec.name,
                 "specialist_specialty": spec.specialty,
                 "date": str(apt_date),
-                "time": str(body["time"]),
+                "time": apt_time.strftime("%H:%M"),
             })
 
-            session.commit()
-            session.refresh(apt)
+            response = ok({"appointment": apt.to_dict()}, status=201)
+            if idem_key:
+                _store_idempotent(session, idem_key, request_hash, response)
 
-            # Обновляем payload события реальным id
-            evt = session.query(Event).filter_by(topic=TOPIC_CREATED, status="pending").order_by(Event.id.desc()).first()
-            if evt:
-                payload = dict(evt.payload)
-                payload["appointment_id"] = apt.id
-                evt.payload = payload
+            try:
                 session.commit()
-
+            except IntegrityError:
+                # Параллельный повтор с тем же ключом успел закоммитить раньше
+                session.rollback()
+                replay = idem_key and _replay_idempotent(session, idem_key, request_hash)
+                if replay:
+                    return replay
+                raise
+
+            if idem_key:
+                _idempotency_cache.set(idem_key, (request_hash, response["statusCode"], response["body"]))
             logger.info(f"Created appointment id={apt.id}")
-            return ok({"appointment": apt.to_dict()}, status=201)
+            return response
 
         # PUT — обновить статус
         if method == "PUT":
             apt_id = params.get("id")
-            if not apt_id:
-                return error("Параметр id обязателен")
 
             try:
                 body = json.loads(event.get("body") or "{}")
             except json.JSONDecodeError:
                 return error("Тело запроса должно быть валидным JSON")
 
+            # Массовая смена статуса
+            if not apt_id and "ids" in body:
+                raw_ids = body.get("ids")
+                if not isinstance(raw_ids, list) or not raw_ids:
+                    return error("Поле ids должно быть непустым списком")
+                if len(raw_ids) > MAX_BULK_IDS:
+                    return error(f"За один запрос можно изменить не более {MAX_BULK_IDS} записей")
+                try:
+                    ids = sorted({int(i) for i in raw_ids})
+                except (ValueError, TypeError):
+                    return error("Поле ids должно содержать целые числа")
+
+                new_status = body.get("status")
+                if not new_status or new_status not in ALLOWED_STATUSES:
+                    return error(f"Статус должен быть одним из: {', '.join(ALLOWED_STATUSES)}")
+
+                changed = _bulk_update_status(session, ids, new_status)
+                _publish_events(session, TOPIC_STATUS, changed)
+                session.commit()
+
+                updated = [c["appointment_id"] for c in changed]
+                skipped = sorted(set(ids) - set(updated))
+                logger.info(f"Bulk status→{new_status}: updated={len(updated)} skipped={len(skipped)}")
+                return ok({"updated": updated, "skipped": skipped, "status": new_status})
+
+            if not apt_id:
+                return error("Параметр id обязателен")
+
             apt = (
                 session.query(Appointment)
                 .options(joinedload(Appointment.specialist))
@@ -182,17 +761,18 @@ def handler(event: dict, context) -> dict:
             if not apt:
                 return error("Запись не найдена", status=404)
 
-            allowed_statuses = {"pending", "confirmed", "cancelled", "completed"}
             new_status = body.get("status")
-            if not new_status or new_status not in allowed_statuses:
-                return error(f"Статус должен быть одним из: {', '.join(allowed_statuses)}")
+            if not new_status or new_status not in ALLOWED_STATUSES:
+                return error(f"Статус должен быть одним из: {', '.join(ALLOWED_STATUSES)}")
 
             old_status = apt.status
             apt.status = new_status
 
             _publish_event(session, TOPIC_STATUS, {
                 "appointment_id": apt.id,
+                "specialist_id": apt.specialist_id,
                 "patient_name": apt.patient_name,
+                "date": apt.appointment_date.isoformat(),
                 "old_status": old_status,
                 "new_status": new_status,
             })
@@ -202,6 +782,36 @@ def handler(event: dict, context) -> dict:
             logger.info(f"Updated appointment id={apt.id} status={old_status}→{new_status}")
             return ok({"appointment": apt.to_dict()})
 
+        # DELETE — снять удержание слота
+        if method == "DELETE" and params.get("action") == "hold":
+            token = params.get("token")
+            if not token:
+                return error("Параметр token обязателен")
+            result = session.execute(
+                update(Schedule)
+                .where(Schedule.hold_token == token)
+                .values(hold_token=None, held_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            return ok({"ok": True, "released": result.rowcount})
+
+        # DELETE — выйти из листа ожидания
+        if method == "DELETE" and params.get("action") == "waitlist":
+            entry_id = params.get("id")
+            if not entry_id:
+                return error("Параметр id обязателен")
+            result = session.execute(
+                update(WaitlistEntry)
+                .where(WaitlistEntry.id == int(entry_id), WaitlistEntry.status == "active")
+                .values(status="cancelled")
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            if not result.rowcount:
+                return error("Активная заявка не найдена", status=404)
+            return ok({"ok": True, "id": int(entry_id)})
+
         # DELETE — отменить
         if method == "DELETE":
             apt_id = params.get("id")
@@ -233,14 +843,17 @@ def handler(event: dict, context) -> dict:
             if slot:
                 slot.is_booked = False
 
+            old_status = apt.status
             apt.status = "cancelled"
 
             _publish_event(session, TOPIC_CANCELLED, {
                 "appointment_id": apt.id,
+                "specialist_id": apt.specialist_id,
                 "patient_name": apt.patient_name,
                 "specialist_name": apt.specialist.name if apt.specialist else "",
                 "date": apt.appointment_date.isoformat(),
                 "time": apt.appointment_time.strftime("%H:%M"),
+                "old_status": old_status,
             })
 
             session.commit()
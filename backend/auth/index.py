@@ -3,11 +3,16 @@
 
 Маршруты:
   POST /?action=register  — регистрация (role: client | doctor)
-  POST /?action=login     — вход, возвращает token
+  POST /?action=login     — вход, возвращает token; попытки ограничены по email и IP (429)
   POST /?action=logout    — выход (удаляет сессию)
   GET  /                  — /me: данные текущего пользователя по токену
+  GET  /?action=cache_stats — статистика кэша токенов в памяти процесса
+  POST /?action=purge_sessions[&batch=&max_batches=] — удалить истёкшие сессии пачками
+
+Режим токенов (AUTH_TOKEN_MODE): session — случайный токен и строка в sessions;
+signed — подписанный токен (tokens.py), который сервисы проверяют без обращения к БД,
+выход заносит его в revoked_tokens. Токены обоих видов принимаются в любом режиме.
 """
-import hashlib
 import json
 import logging
 import os
@@ -15,31 +20,172 @@ import re
 import secrets
 from datetime import datetime, timedelta
 
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from models import User, Session, Specialist, get_session_db
-from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS
+from models import User, Session, Specialist, RevokedToken, get_session_db
+from passwords import HashingBusy, hash_password, needs_rehash, verify_dummy, verify_password
+from ratelimit import SlidingWindowLimiter
+from tokens import RevocationList, is_signed_token, sign_token, token_secret, verify_token
+from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS, TTLCache
 
 logger = setup_logger("auth")
 
 TOKEN_TTL_HOURS = 72
 
-
-def _hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-
-def _get_user_by_token(db, token: str) -> User | None:
-    """Возвращает пользователя по валидному токену."""
-    sess = (
-        db.query(Session)
-        .filter_by(token=token)
-        .filter(Session.expires_at > datetime.utcnow())
-        .first()
-    )
-    if not sess:
+# Кэш токен → профиль в тёплом инстансе. Выход инвалидирует запись только в своём
+# инстансе, поэтому TTL короткий: на других инстансах токен живёт не дольше него
+TOKEN_CACHE_TTL_SECONDS = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", "60"))
+TOKEN_MODE = os.environ.get("AUTH_TOKEN_MODE", "session")
+if TOKEN_MODE == "signed" and not token_secret():
+    logger.warning("AUTH_TOKEN_MODE=signed without AUTH_TOKEN_SECRET, falling back to session tokens")
+    TOKEN_MODE = "session"
+
+HASHING_RETRY_AFTER_SECONDS = 1
+
+PG_UNIQUE_VIOLATION = "23505"
+PG_FOREIGN_KEY_VIOLATION = "23503"
+
+PURGE_BATCH_DEFAULT = 1000
+PURGE_BATCH_MAX = 10000
+PURGE_MAX_BATCHES_DEFAULT = 50
+PURGE_MAX_BATCHES_MAX = 200
+
+_revocations = RevocationList()
+_token_cache = TTLCache(maxsize=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "4096")), ttl=TOKEN_CACHE_TTL_SECONDS)
+_login_by_email = SlidingWindowLimiter(
+    "login_email",
+    limit=int(os.environ.get("AUTH_LOGIN_LIMIT_EMAIL", "10")),
+    window=int(os.environ.get("AUTH_LOGIN_WINDOW_SECONDS", "300")),
+)
+_login_by_ip = SlidingWindowLimiter(
+    "login_ip",
+    limit=int(os.environ.get("AUTH_LOGIN_LIMIT_IP", "50")),
+    window=int(os.environ.get("AUTH_LOGIN_WINDOW_SECONDS", "300")),
+)
+
+
+def _profile(user: User, specialist: Specialist | None) -> dict:
+    result = user.to_dict()
+    if specialist:
+        result["specialist"] = specialist.to_dict()
+    return result
+
+
+def _insert_for(db):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей БД."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _integrity_code(exc: IntegrityError) -> str:
+    """SQLSTATE нарушения ограничения (psycopg2 — pgcode, иначе по тексту ошибки)."""
+    code = getattr(exc.orig, "pgcode", None)
+    if code:
+        return code
+    return PG_FOREIGN_KEY_VIOLATION if "FOREIGN KEY" in str(exc.orig).upper() else PG_UNIQUE_VIOLATION
+
+
+def _purge_expired_sessions(db, batch: int, max_batches: int) -> tuple[int, bool]:
+    """
+    Удаляет истёкшие сессии пачками по batch строк, каждая пачка — своя короткая
+    транзакция (блокировки держатся недолго, SKIP LOCKED не ждёт чужие строки).
+    Возвращает число удалённых строк и признак, что истёкшие ещё остались.
+    """
+    deleted = 0
+    for _ in range(max_batches):
+        ids = (
+            select(Session.id)
+            .where(Session.expires_at < datetime.utcnow())
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+        )
+        removed = db.execute(
+            delete(Session).where(Session.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        deleted += removed
+        if removed < batch:
+            return deleted, False
+    return deleted, True
+
+
+def _too_many_requests(retry_after: int) -> dict:
+    response = error("Слишком много попыток входа, повторите позже", status=429)
+    response["headers"] = {**response["headers"], "Retry-After": str(retry_after)}
+    return response
+
+
+def _issue_token(db, user: User) -> str:
+    """Выдаёт токен в текущем режиме; для session добавляет строку sessions (без commit)."""
+    if TOKEN_MODE == "signed":
+        return sign_token(token_secret(), user.id, user.role, user.specialist_id, TOKEN_TTL_HOURS * 3600)
+    token_value = secrets.token_hex(32)
+    db.add(Session(
+        user_id=user.id,
+        token=token_value,
+        expires_at=datetime.utcnow() + timedelta(hours=TOKEN_TTL_HOURS),
+    ))
+    return token_value
+
+
+def _signed_claims(db, token: str) -> dict | None:
+    """Claims подписанного токена с проверкой подписи, срока и списка отозванных."""
+    secret = token_secret()
+    claims = verify_token(secret, token) if secret else None
+    if not claims:
         return None
-    return sess.user
+    _revocations.ensure_fresh(db)
+    return None if _revocations.is_revoked(claims["jti"]) else claims
+
+
+def _get_profile_by_token(db, token: str) -> dict | None:
+    """
+    Профиль пользователя по валидному токену: сначала кэш процесса,
+    иначе один запрос — sessions JOIN users LEFT JOIN specialists
+    (для подписанного токена — users LEFT JOIN specialists по uid).
+    """
+    claims = None
+    if is_signed_token(token):
+        claims = _signed_claims(db, token)
+        if not claims:
+            _token_cache.pop(token)
+            return None
+
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    now = datetime.utcnow()
+    if claims:
+        row = db.execute(
+            select(User, Specialist)
+            .outerjoin(Specialist, Specialist.id == User.specialist_id)
+            .where(User.id == claims["uid"], User.is_active == True)  # noqa: E712
+        ).first()
+        if not row:
+            return None
+        user, specialist = row
+        expires_at = datetime.utcfromtimestamp(claims["exp"])
+    else:
+        row = db.execute(
+            select(Session.expires_at, User, Specialist)
+            .join(User, User.id == Session.user_id)
+            .outerjoin(Specialist, Specialist.id == User.specialist_id)
+            .where(Session.token == token, Session.expires_at > now)
+        ).first()
+        if not row:
+            return None
+        expires_at, user, specialist = row
+
+    profile = _profile(user, specialist)
+    # Запись в кэше не должна пережить саму сессию
+    ttl = min(TOKEN_CACHE_TTL_SECONDS, (expires_at - now).total_seconds())
+    _token_cache.set(token, profile, ttl=ttl)
+    return profile
 
 
 def handler(event: dict, context) -> dict:
@@ -59,18 +205,21 @@ def handler(event: dict, context) -> dict:
     try:
         db = get_session_db()
 
+        # GET /?action=cache_stats — статистика кэша токенов
+        if method == "GET" and params.get("action") == "cache_stats":
+            return ok({"token_cache": _token_cache.stats(), "ttl_seconds": TOKEN_CACHE_TTL_SECONDS,
+                       "token_mode": TOKEN_MODE, "revoked_tokens": len(_revocations),
+                       "login_limits": {"email": _login_by_email.stats(), "ip": _login_by_ip.stats()}})
+
         # GET / — профиль по токену
         if method == "GET":
             if not token:
                 return error("Токен не передан", status=401)
-            user = _get_user_by_token(db, token)
-            if not user:
+            profile = _get_profile_by_token(db, token)
+            if not profile:
                 return error("Токен недействителен или истёк", status=401)
-            result = user.to_dict()
-            if user.specialist:
-                result["specialist"] = user.specialist.to_dict()
-            logger.info(f"GET /me user_id={user.id} role={user.role}")
-            return ok({"user": result})
+            logger.info(f"GET /me user_id={profile['id']} role={profile['role']}")
+            return ok({"user": profile})
 
         if method == "POST":
             action = params.get("action")
@@ -107,38 +256,37 @@ def handler(event: dict, context) -> dict:
                     spec_id = body.get("specialist_id")
                     if not spec_id:
                         return error("Для роли doctor необходимо указать specialist_id")
-                    spec = db.get(Specialist, int(spec_id))
-                    if not spec:
-                        return error("Специалист не найден", status=404)
-                    specialist_id = spec.id
-
-                existing = db.query(User).filter_by(email=email).first()
-                if existing:
-                    return error("Пользователь с таким email уже зарегистрирован", status=409)
+                    try:
+                        specialist_id = int(spec_id)
+                    except (ValueError, TypeError):
+                        return error("specialist_id должен быть целым числом")
 
+                # Одна транзакция: INSERT users ... RETURNING id, INSERT sessions, COMMIT.
+                # Дубликат email и несуществующего специалиста ловят ограничения БД
                 user = User(
                     email=email,
-                    password_hash=_hash_password(password),
+                    password_hash=hash_password(password),
                     full_name=str(body["full_name"])[:200],
                     phone=str(body.get("phone", ""))[:50] or None,
                     role=role,
                     specialist_id=specialist_id,
+                    is_active=True,
                 )
                 db.add(user)
-                db.commit()
-                db.refresh(user)
+                try:
+                    db.flush()
+                except IntegrityError as exc:
+                    db.rollback()
+                    if _integrity_code(exc) == PG_FOREIGN_KEY_VIOLATION:
+                        return error("Специалист не найден", status=404)
+                    return error("Пользователь с таким email уже зарегистрирован", status=409)
 
-                token_value = secrets.token_hex(32)
-                session = Session(
-                    user_id=user.id,
-                    token=token_value,
-                    expires_at=datetime.utcnow() + timedelta(hours=TOKEN_TTL_HOURS),
-                )
-                db.add(session)
+                token_value = _issue_token(db, user)
+                result = user.to_dict()
                 db.commit()
 
-                logger.info(f"Registered user id={user.id} email={email} role={role}")
-                return ok({"token": token_value, "user": user.to_dict()}, status=201)
+                logger.info(f"Registered user id={result['id']} email={email} role={role}")
+                return ok({"token": token_value, "user": result}, status=201)
 
             # --- LOGIN ---
             if action == "login":
@@ -156,34 +304,80 @@ def handler(event: dict, context) -> dict:
                 if not email or not password:
                     return error("Email и пароль обязательны")
 
+                # Лимиты проверяются до поиска пользователя и хеширования; попытка
+                # учитывается в обоих, даже если email уже упёрся в лимит
+                source_ip = ((event.get("requestContext") or {}).get("identity") or {}).get("sourceIp")
+                allowed, retry_after = _login_by_email.hit(email, db)
+                if source_ip:
+                    ip_allowed, ip_retry_after = _login_by_ip.hit(source_ip, db)
+                    allowed, retry_after = allowed and ip_allowed, max(retry_after, ip_retry_after)
+                if not allowed:
+                    logger.warning(f"Login throttled email={email} ip={source_ip}")
+                    return _too_many_requests(retry_after)
+
                 user = db.query(User).filter_by(email=email, is_active=True).first()
-                if not user or user.password_hash != _hash_password(password):
+                if not user:
+                    verify_dummy(password)
                     return error("Неверный email или пароль", status=401)
+                if not verify_password(password, user.password_hash):
+                    return error("Неверный email или пароль", status=401)
+                # Устаревший или ослабленный хеш пересчитываем, пока пароль известен
+                if needs_rehash(user.password_hash):
+                    user.password_hash = hash_password(password)
+                    logger.info(f"Password rehashed for user_id={user.id}")
 
-                token_value = secrets.token_hex(32)
-                session = Session(
-                    user_id=user.id,
-                    token=token_value,
-                    expires_at=datetime.utcnow() + timedelta(hours=TOKEN_TTL_HOURS),
-                )
-                db.add(session)
+                token_value = _issue_token(db, user)
                 db.commit()
 
-                result = user.to_dict()
-                if user.specialist:
-                    result["specialist"] = user.specialist.to_dict()
+                result = _profile(user, user.specialist)
 
                 logger.info(f"Login user_id={user.id} email={email}")
                 return ok({"token": token_value, "user": result})
 
+            # --- PURGE_SESSIONS ---
+            if action == "purge_sessions":
+                try:
+                    batch = min(PURGE_BATCH_MAX, max(1, int(params.get("batch", PURGE_BATCH_DEFAULT))))
+                    max_batches = min(PURGE_MAX_BATCHES_MAX,
+                                      max(1, int(params.get("max_batches", PURGE_MAX_BATCHES_DEFAULT))))
+                except (TypeError, ValueError):
+                    return error("Параметры batch и max_batches должны быть целыми числами")
+
+                deleted, has_more = _purge_expired_sessions(db, batch, max_batches)
+                # Отозванные подписанные токены после истечения срока хранить незачем
+                revoked = db.execute(
+                    delete(RevokedToken)
+                    .where(RevokedToken.expires_at < datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                rate_keys = _login_by_email.purge(db) + _login_by_ip.purge(db)
+                db.commit()
+                logger.info(f"Purged {deleted} expired sessions, {revoked} revoked tokens, "
+                            f"{rate_keys} rate limit keys, has_more={has_more}")
+                return ok({"deleted_sessions": deleted, "deleted_revoked_tokens": revoked,
+                           "deleted_rate_limit_keys": rate_keys, "has_more": has_more})
+
             # --- LOGOUT ---
             if action == "logout":
                 if not token:
                     return error("Токен не передан", status=401)
-                sess = db.query(Session).filter_by(token=token).first()
-                if sess:
-                    sess.expires_at = datetime.utcnow()
-                    db.commit()
+                if is_signed_token(token):
+                    secret = token_secret()
+                    claims = verify_token(secret, token) if secret else None
+                    if claims:
+                        # Повторный или параллельный logout тем же токеном — не ошибка
+                        db.execute(_insert_for(db)(RevokedToken).values(
+                            jti=claims["jti"], expires_at=datetime.utcfromtimestamp(claims["exp"]),
+                            revoked_at=datetime.utcnow(),
+                        ).on_conflict_do_nothing(index_elements=["jti"]))
+                        db.commit()
+                        _revocations.add(claims["jti"], claims["exp"])
+                else:
+                    sess = db.query(Session).filter_by(token=token).first()
+                    if sess:
+                        sess.expires_at = datetime.utcnow()
+                        db.commit()
+                _token_cache.pop(token)
                 logger.info(f"Logout token={token[:8]}...")
                 return ok({"ok": True})
 
@@ -191,6 +385,14 @@ def handler(event: dict, context) -> dict:
 
         return error(f"Метод {method} не поддерживается", status=405)
 
+    except HashingBusy:
+        if db:
+            db.rollback()
+        logger.warning("Password hashing pool is saturated")
+        response = error("Сервис перегружен, повторите попытку позже", status=503)
+        response["headers"] = {**response["headers"], "Retry-After": str(HASHING_RETRY_AFTER_SECONDS)}
+        return response
+
     except IntegrityError as exc:
         if db:
             db.rollback()
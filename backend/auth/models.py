@@ -7,7 +7,7 @@ from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer,
+    BigInteger, Boolean, Column, DateTime, ForeignKey, Integer,
     JSON, Numeric, String, Text, Time, Date, Index, create_engine
 )
 from sqlalchemy.orm import DeclarativeBase, relationship, sessionmaker
@@ -74,6 +74,7 @@ class Session(Base):
     __tablename__ = "sessions"
     __table_args__ = (
         Index("idx_sessions_token", "token"),
+        Index("idx_sessions_expires_at", "expires_at"),
         {"schema": SCHEMA},
     )
 
@@ -86,6 +87,30 @@ class Session(Base):
     user = relationship("User", back_populates="sessions")
 
 
+class RevokedToken(Base):
+    """Подписанный токен доступа, отозванный до истечения срока (logout)."""
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index("idx_revoked_tokens_expires_at", "expires_at"),
+        {"schema": SCHEMA},
+    )
+
+    jti: str = Column(String(32), primary_key=True)
+    expires_at: datetime = Column(DateTime, nullable=False)
+    revoked_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+
+class RateLimitWindow(Base):
+    """Счётчики скользящего окна ограничения попыток входа (общий режим)."""
+    __tablename__ = "auth_rate_limits"
+    __table_args__ = {"schema": SCHEMA}
+
+    key: str = Column(String(300), primary_key=True)
+    window_start: int = Column(BigInteger, nullable=False)
+    prev_count: int = Column(Integer, nullable=False, default=0)
+    curr_count: int = Column(Integer, nullable=False, default=0)
+
+
 def get_engine():
     return create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
 
@@ -0,0 +1,134 @@
+"""
+Хеширование паролей: KDF с настраиваемой стоимостью и версионируемым форматом.
+
+Форматы хранимого хеша:
+  scrypt$<n>$<r>$<p>$<salt>$<hash>          — hashlib.scrypt (по умолчанию)
+  pbkdf2_sha256$<iterations>$<salt>$<hash>  — hashlib.pbkdf2_hmac
+  <64 hex>                                  — устаревший несолёный SHA-256
+salt и hash — base64 без паддинга. Хеш с параметрами слабее текущих
+(или устаревший) помечается needs_rehash и пересчитывается при входе.
+
+KDF грузит CPU, поэтому вычисления идут в ограниченном пуле потоков
+(hashlib отпускает GIL): не больше AUTH_HASH_WORKERS одновременно и не больше
+AUTH_HASH_MAX_PENDING в очереди — сверх этого HashingBusy, а не рост задержки.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = os.environ.get("AUTH_PASSWORD_ALGO", "scrypt")
+SCRYPT_N = int(os.environ.get("AUTH_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.environ.get("AUTH_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("AUTH_SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.environ.get("AUTH_PBKDF2_ITERATIONS", "600000"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", "2"))
+HASH_MAX_PENDING = int(os.environ.get("AUTH_HASH_MAX_PENDING", "8"))
+HASH_WAIT_SECONDS = float(os.environ.get("AUTH_HASH_WAIT_SECONDS", "0.2"))
+
+_LEGACY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="kdf")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_PENDING)
+# Хеш случайного пароля с текущими параметрами — для входа с неизвестным email
+_dummy_hash: str | None = None
+
+
+class HashingBusy(Exception):
+    """Пул хеширования переполнен — запрос стоит повторить позже."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=HASH_BYTES)
+
+
+def _hash(password: str) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    if ALGORITHM == "pbkdf2_sha256":
+        digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _verify(password: str, stored: str) -> bool:
+    if _LEGACY_RE.match(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            digest = _scrypt(password, _b64decode(parts[4]), n, r, p)
+            return hmac.compare_digest(digest, _b64decode(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = _pbkdf2(password, _b64decode(parts[2]), int(parts[1]))
+            return hmac.compare_digest(digest, _b64decode(parts[3]))
+    except ValueError:
+        return False
+    return False
+
+
+def needs_rehash(stored: str) -> bool:
+    """Хеш не текущего алгоритма или с параметрами слабее текущих."""
+    parts = stored.split("$")
+    if parts[0] != ALGORITHM:
+        return True
+    try:
+        if ALGORITHM == "scrypt":
+            # Каждый параметр отдельно: больший n не компенсирует ослабленные r или p
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            return n < SCRYPT_N or r < SCRYPT_R or p < SCRYPT_P
+        return int(parts[1]) < PBKDF2_ITERATIONS
+    except (IndexError, ValueError):
+        return True
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=HASH_WAIT_SECONDS):
+        raise HashingBusy()
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def verify_password(password: str, stored: str) -> bool:
+    return _run(_verify, password, stored)
+
+
+def verify_dummy(password: str) -> bool:
+    """
+    Проверка для несуществующего пользователя: тратит одно вычисление KDF, как и
+    настоящая, чтобы время ответа не выдавало, зарегистрирован ли email. Всегда False.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        # Первое вычисление хеша стоит столько же, сколько проверка
+        _dummy_hash = hash_password(secrets.token_urlsafe(16))
+    else:
+        verify_password(password, _dummy_hash)
+    return False
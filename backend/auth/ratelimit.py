@@ -0,0 +1,109 @@
+"""
+Ограничение частоты попыток входа: скользящее окно по двум счётчикам.
+
+Для каждого ключа (email, IP) хранятся начало текущего окна и число попыток
+в текущем и предыдущем окне; оценка за последние window секунд —
+prev * (доля предыдущего окна, ещё попадающая в интервал) + curr.
+Память O(1) на ключ, ключи вытесняются по LRU.
+
+Режимы (AUTH_RATELIMIT_MODE): memory — счётчики в памяти инстанса;
+postgres — общие для всех инстансов, один INSERT ... ON CONFLICT DO UPDATE
+... RETURNING на ключ. Считаются все попытки, в том числе отклонённые, —
+непрерывный перебор не выходит из-под ограничения.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import delete, text
+
+from models import SCHEMA, RateLimitWindow
+
+MODE = os.environ.get("AUTH_RATELIMIT_MODE", "memory")
+MAX_KEYS = int(os.environ.get("AUTH_RATELIMIT_MAX_KEYS", "10000"))
+# auth_rate_limits.key — VARCHAR(300) вместе с префиксом "<name>:"
+MAX_KEY_LENGTH = 300
+
+
+class SlidingWindowLimiter:
+    """Лимит limit попыток за window секунд на ключ."""
+
+    def __init__(self, name: str, limit: int, window: int, maxsize: int = MAX_KEYS):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.evictions = 0
+
+    def _verdict(self, prev: int, curr: int, window_start: int, now: float) -> tuple[bool, int]:
+        weight = 1 - (now - window_start) / self.window
+        if prev * weight + curr <= self.limit:
+            return True, 0
+        self.rejected += 1
+        return False, max(1, math.ceil(window_start + self.window - now))
+
+    def _bounded(self, key: str) -> str:
+        """Длинный ключ (email без ограничения длины) заменяется его SHA-256."""
+        if len(self.name) + 1 + len(key) <= MAX_KEY_LENGTH:
+            return key
+        return "sha256:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def hit(self, key: str, db=None) -> tuple[bool, int]:
+        """Учитывает попытку; возвращает (разрешено, через сколько секунд повторить)."""
+        key = self._bounded(key)
+        now = time.time()
+        window_start = int(now // self.window * self.window)
+        if MODE == "postgres" and db is not None:
+            prev, curr = self._hit_postgres(db, key, window_start)
+            return self._verdict(prev, curr, window_start, now)
+
+        with self._lock:
+            started, prev, curr = self._data.get(key, (window_start, 0, 0))
+            if started != window_start:
+                prev = curr if started == window_start - self.window else 0
+                curr = 0
+            curr += 1
+            self._data[key] = (window_start, prev, curr)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return self._verdict(prev, curr, window_start, now)
+
+    def _hit_postgres(self, db, key: str, window_start: int) -> tuple[int, int]:
+        row = db.execute(text(f"""
+            INSERT INTO {SCHEMA}.auth_rate_limits AS r (key, window_start, prev_count, curr_count)
+            VALUES (:key, :start, 0, 1)
+            ON CONFLICT (key) DO UPDATE SET
+                prev_count = CASE
+                    WHEN r.window_start = :start THEN r.prev_count
+                    WHEN r.window_start = :start - :window THEN r.curr_count
+                    ELSE 0 END,
+                curr_count = CASE WHEN r.window_start = :start THEN r.curr_count ELSE 0 END + 1,
+                window_start = :start
+            RETURNING prev_count, curr_count
+        """), {"key": f"{self.name}:{key}", "start": window_start, "window": self.window}).first()
+        db.commit()
+        return row[0], row[1]
+
+    def purge(self, db) -> int:
+        """Удаляет из общей таблицы ключи, не обновлявшиеся два окна."""
+        cutoff = int(time.time()) - 2 * self.window
+        result = db.execute(
+            delete(RateLimitWindow)
+            .where(RateLimitWindow.key.like(f"{self.name}:%"), RateLimitWindow.window_start < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = len(self._data)
+        return {"limit": self.limit, "window": self.window, "keys": keys,
+                "rejected": self.rejected, "evictions": self.evictions}
@@ -0,0 +1,143 @@
+"""
+Подписанные токены доступа (HMAC-SHA256) и список отозванных токенов.
+
+Формат: v1.<base64url(JSON claims)>.<base64url(подпись)>, claims:
+uid — id пользователя, role, spec — id специалиста (или null), exp — unix-время
+истечения, jti — идентификатор токена. Проверка подписи и срока не обращается к БД;
+отозванные до истечения токены (logout) хранятся в revoked_tokens, сервисы держат их
+множество в памяти и перечитывают не чаще раза в REVOCATION_REFRESH_SECONDS.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import RevokedToken
+
+TOKEN_PREFIX = "v1"
+REVOCATION_REFRESH_SECONDS = int(os.environ.get("AUTH_REVOCATION_REFRESH", "30"))
+
+
+def token_secret() -> str | None:
+    return os.environ.get("AUTH_TOKEN_SECRET") or None
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_PREFIX + ".")
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(secret: str, signing_input: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest())
+
+
+def sign_token(secret: str, user_id: int, role: str, specialist_id: int | None, ttl_seconds: int) -> str:
+    claims = {
+        "uid": user_id,
+        "role": role,
+        "spec": specialist_id,
+        "exp": int(time.time()) + ttl_seconds,
+        "jti": secrets.token_hex(16),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = f"{TOKEN_PREFIX}.{payload}"
+    return f"{signing_input}.{_signature(secret, signing_input)}"
+
+
+def verify_token(secret: str, token: str) -> dict | None:
+    """Claims токена, если подпись верна и срок не истёк; иначе None. Отзыв не проверяется."""
+    try:
+        prefix, payload, signature = token.split(".")
+    except ValueError:
+        return None
+    if prefix != TOKEN_PREFIX:
+        return None
+    # Байты, а не str: compare_digest не принимает строки с не-ASCII символами
+    expected = _signature(secret, f"{prefix}.{payload}")
+    if not hmac.compare_digest(signature.encode(), expected.encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict) or not isinstance(claims.get("exp"), (int, float)):
+        return None
+    if claims["exp"] <= time.time():
+        return None
+    return claims
+
+
+class RevocationList:
+    """Множество jti отозванных и ещё не истёкших токенов в памяти процесса."""
+
+    def __init__(self, refresh_seconds: int = REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.loaded_at = 0.0
+
+    def refresh(self, db) -> int:
+        """Перечитывает список целиком: в нём только отозванные токены, срок которых не вышел."""
+        rows = db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > datetime.utcnow())
+        ).all()
+        revoked = {jti: _unix(expires_at) for jti, expires_at in rows}
+        with self._lock:
+            self._revoked = revoked
+            self.loaded_at = time.monotonic()
+        return len(revoked)
+
+    def ensure_fresh(self, db) -> None:
+        if time.monotonic() - self.loaded_at >= self.refresh_seconds:
+            self.refresh(db)
+
+    def add(self, jti: str, exp: float) -> None:
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def is_revoked(self, jti: str) -> bool:
+        with self._lock:
+            exp = self._revoked.get(jti)
+            if exp is not None and exp <= time.time():
+                del self._revoked[jti]
+                return False
+        return exp is not None
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+def _unix(value: datetime) -> float:
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def verify_request_token(event: dict, db, revocations: RevocationList) -> dict | None:
+    """
+    Claims из заголовка X-Auth-Token для сервисов, проверяющих доступ у себя.
+    Обращается к БД только для периодического обновления списка отозванных.
+    """
+    secret = token_secret()
+    headers = event.get("headers") or {}
+    token = headers.get("X-Auth-Token") or headers.get("x-auth-token")
+    if not secret or not token or not is_signed_token(token):
+        return None
+    claims = verify_token(secret, token)
+    if not claims:
+        return None
+    revocations.ensure_fresh(db)
+    return None if revocations.is_revoked(claims["jti"]) else claims
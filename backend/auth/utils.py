@@ -1,9 +1,12 @@
 """
-Утилиты: логирование, CORS-заголовки, стандартные HTTP-ответы.
+Утилиты: логирование, CORS-заголовки, стандартные HTTP-ответы, кэш в памяти процесса.
 """
 import json
 import logging
+import threading
+import time
 import traceback
+from collections import OrderedDict
 
 
 def setup_logger(name: str) -> logging.Logger:
@@ -42,3 +45,65 @@ def handle_exception(logger: logging.Logger, exc: Exception, context: str = "")
     tb = traceback.format_exc()
     logger.error(f"Unhandled exception in {context}: {exc}\n{tb}")
     return error("Внутренняя ошибка сервера.", status=500, details=str(exc))
+
+
+class TTLCache:
+    """
+    Ограниченный LRU-кэш с временем жизни записей.
+    Живёт в памяти процесса и переживает тёплые вызовы функции.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
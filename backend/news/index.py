@@ -1,23 +1,56 @@
 """
 Микросервис новостей.
 Маршруты:
-  GET /?action=list     — список опубликованных новостей
-  GET /?action=get&id=N — одна новость
+  GET /?action=list[&before=&limit=] — список опубликованных новостей (keyset-пагинация,
+                          кэш в процессе, ETag/Last-Modified и 304)
+  GET /?action=get&id=N — одна новость (с готовым content_html и reading_minutes)
+  GET /?action=search&q=Q[&limit=] — полнотекстовый поиск (russian) с подсветкой фрагментов
+  POST /?action=render  — HTML, превью и время чтения для текста, без сохранения
   POST /?action=create  — создать новость
   PUT /?action=update   — обновить новость
   DELETE /?action=delete&id=N — удалить новость
+  POST /?action=rerender[&batch=] — пересчитать HTML, превью и время чтения у всех новостей
+
+HTML, превью и время чтения считаются при записи (render.py), чтения — простые выборки.
 """
+import hashlib
+import html
 import json
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
 from sqlalchemy import create_engine, text
 
+from render import make_preview, render
+
 SCHEMA = "t_p60955846_expert_appointment_s"
 
+LIST_DEFAULT_LIMIT = 20
+LIST_MAX_LIMIT = 50
+# Как часто тёплый инстанс сверяет версию новостей с cache_versions
+VERSION_CHECK_SECONDS = 5
+LIST_CACHE_MAX_PAGES = 32
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+SNIPPET_CONTEXT_CHARS = 80
+RERENDER_BATCH = 200
+# ts_headline выделяет совпадения символами из области частного использования:
+# результат сначала экранируется, и только потом они заменяются на <mark>
+MARK_START, MARK_STOP = "\ue000", "\ue001"
+TITLE_HEADLINE_OPTIONS = f"HighlightAll=true, StartSel={MARK_START}, StopSel={MARK_STOP}"
+HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=35, MinWords=15, MaxFragments=2"
+
+_engine = None
+_list_cache = {"version": None, "updated_at": None, "checked_at": 0.0, "pages": {}}
+
 
 def get_engine():
-    return create_engine(os.environ["DATABASE_URL"])
+    global _engine
+    if _engine is None:
+        _engine = create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
+    return _engine
 
 
 def serial(obj):
@@ -43,8 +76,165 @@ def err(msg, status=400):
     return {"statusCode": status, "headers": cors(), "body": json.dumps({"error": msg})}
 
 
+def text_field(body, name):
+    """Строковое поле тела без NUL: Postgres не хранит его в text, а рендерер использует как разделитель."""
+    return str(body.get(name) or "").replace("\x00", "").strip()
+
+
+def bump_version(conn):
+    """Новая версия списка новостей в той же транзакции, что и изменение."""
+    result = conn.execute(text(
+        f"UPDATE {SCHEMA}.cache_versions SET version = version + 1, updated_at = NOW() WHERE name = 'news'"
+    ))
+    if result.rowcount == 0:
+        conn.execute(text(f"INSERT INTO {SCHEMA}.cache_versions (name, version) VALUES ('news', 1)"))
+    _list_cache["checked_at"] = 0.0
+
+
+def parse_before(raw):
+    """Курсор before: published_at (ISO) или published_at|id последней показанной новости."""
+    published_at, _, news_id = raw.partition("|")
+    return datetime.fromisoformat(published_at), int(news_id) if news_id else None
+
+
+def list_page(conn, before, limit):
+    """Страница списка из кэша процесса; при смене версии кэш сбрасывается."""
+    now = time.monotonic()
+    if now - _list_cache["checked_at"] >= VERSION_CHECK_SECONDS:
+        row = conn.execute(text(
+            f"SELECT version, updated_at FROM {SCHEMA}.cache_versions WHERE name = 'news'"
+        )).fetchone()
+        version, updated_at = row if row else (None, None)
+        if version != _list_cache["version"]:
+            _list_cache["pages"] = {}
+        _list_cache.update(version=version, updated_at=updated_at, checked_at=now)
+
+    key = (before, limit)
+    page = _list_cache["pages"].get(key)
+    if page is not None:
+        return page
+
+    published_before, before_id = parse_before(before) if before else (None, None)
+    sql = f"SELECT id, title, preview, reading_minutes, published_at FROM {SCHEMA}.news WHERE is_published = TRUE"
+    args = {"limit": limit}
+    if published_before and before_id is not None:
+        sql += " AND (published_at, id) < (:before, :before_id)"
+        args.update(before=published_before, before_id=before_id)
+    elif published_before:
+        sql += " AND published_at < :before"
+        args["before"] = published_before
+    sql += " ORDER BY published_at DESC, id DESC LIMIT :limit"
+    rows = conn.execute(text(sql), args).fetchall()
+
+    news = [{"id": r[0], "title": r[1], "preview": r[2], "reading_minutes": r[3], "published_at": r[4]} for r in rows]
+    next_before = f"{rows[-1][4].isoformat()}|{rows[-1][0]}" if len(rows) == limit else None
+    body = json.dumps({"news": news, "next_before": next_before}, default=serial)
+    page = {"body": body, "etag": f'"{hashlib.sha1(body.encode()).hexdigest()}"'}
+    if len(_list_cache["pages"]) >= LIST_CACHE_MAX_PAGES:
+        _list_cache["pages"].pop(next(iter(_list_cache["pages"])))
+    _list_cache["pages"][key] = page
+    return page
+
+
+def _marked(headline):
+    """Экранированный вывод ts_headline с совпадениями в <mark>."""
+    return html.escape(headline).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+def search_news(conn, query, limit):
+    """
+    Postgres: websearch_to_tsquery по GIN-индексу search_vector, ранжирование ts_rank_cd
+    (заголовок весит больше текста), ts_headline считается только для отобранных строк.
+    В обоих случаях title и snippet — экранированный HTML, совпадения выделены <mark>.
+    Другие СУБД: подстрока без учёта регистра в Python и фрагмент вокруг первого вхождения.
+    """
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text(f"""
+            WITH hits AS (
+                SELECT n.id, n.title, n.content, n.published_at, ts_rank_cd(n.search_vector, q) AS rank, q
+                FROM {SCHEMA}.news n, websearch_to_tsquery('russian', :q) q
+                WHERE n.is_published = TRUE AND n.search_vector @@ q
+                ORDER BY rank DESC, n.published_at DESC
+                LIMIT :limit
+            )
+            SELECT id, ts_headline('russian', title, q, :title_options),
+                   ts_headline('russian', content, q, :options), published_at, rank
+            FROM hits ORDER BY rank DESC, published_at DESC
+        """), {"q": query, "limit": limit, "title_options": TITLE_HEADLINE_OPTIONS,
+              "options": HEADLINE_OPTIONS}).fetchall()
+        return [{"id": r[0], "title": _marked(r[1]), "snippet": _marked(r[2]), "published_at": r[3],
+                 "rank": round(float(r[4]), 4)}
+                for r in rows]
+
+    needle = query.casefold()
+    found = []
+    rows = conn.execute(text(
+        f"SELECT id, title, content, published_at FROM {SCHEMA}.news WHERE is_published = TRUE"
+    )).fetchall()
+    for news_id, title, content, published_at in rows:
+        in_title = title.casefold().find(needle)
+        in_content = content.casefold().find(needle)
+        if in_title < 0 and in_content < 0:
+            continue
+        if in_content >= 0:
+            start = max(0, in_content - SNIPPET_CONTEXT_CHARS)
+            end = in_content + len(query) + SNIPPET_CONTEXT_CHARS
+            snippet = (
+                html.escape(content[start:in_content]) + "<mark>"
+                + html.escape(content[in_content:in_content + len(query)]) + "</mark>"
+                + html.escape(content[in_content + len(query):end])
+            )
+        else:
+            snippet = html.escape(content[:2 * SNIPPET_CONTEXT_CHARS])
+        found.append({"id": news_id, "title": html.escape(title), "snippet": snippet,
+                      "published_at": published_at, "rank": 1.0 if in_title >= 0 else 0.5})
+    found.sort(key=lambda item: str(item["published_at"]), reverse=True)
+    found.sort(key=lambda item: item["rank"], reverse=True)
+    return found[:limit]
+
+
+def rerender_all(conn, batch):
+    """
+    Пересчитывает производные поля пачками по id, каждая пачка — отдельная транзакция.
+    Превью перезаписывается, только если оно было автоматическим (старое content[:150]).
+    """
+    last_id, updated = 0, 0
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, content, preview FROM {SCHEMA}.news WHERE id > :last_id ORDER BY id LIMIT :batch"
+        ), {"last_id": last_id, "batch": batch}).fetchall()
+        if not rows:
+            break
+        params = []
+        for news_id, content, preview in rows:
+            auto = not preview or preview == content[:150].strip() or preview == make_preview(content)
+            params.append({"id": news_id, **render(content, None if auto else preview)})
+        conn.execute(text(
+            f"UPDATE {SCHEMA}.news SET content_html = :content_html, preview = :preview, "
+            f"reading_minutes = :reading_minutes WHERE id = :id"
+        ), params)
+        conn.commit()
+        last_id, updated = rows[-1][0], updated + len(rows)
+    bump_version(conn)
+    conn.commit()
+    return updated
+
+
+def not_modified(headers, etag, last_modified):
+    if_none_match = headers.get("If-None-Match") or headers.get("if-none-match")
+    if if_none_match:
+        return if_none_match == etag
+    if_modified_since = headers.get("If-Modified-Since") or headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(if_modified_since).replace(tzinfo=None) >= last_modified.replace(microsecond=0)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
 def handler(event: dict, context) -> dict:
-    """Микросервис новостей: список, создание, обновление, удаление."""
+    """Микросервис новостей: список, поиск, создание, обновление, удаление."""
     if event.get("httpMethod") == "OPTIONS":
         return {"statusCode": 200, "headers": cors(), "body": ""}
 
@@ -56,50 +246,98 @@ def handler(event: dict, context) -> dict:
 
     with engine.connect() as conn:
         if method == "GET" and action == "list":
-            rows = conn.execute(text(
-                f"SELECT id, title, preview, published_at FROM {SCHEMA}.news WHERE is_published = TRUE ORDER BY published_at DESC LIMIT 20"
-            )).fetchall()
-            news = [{"id": r[0], "title": r[1], "preview": r[2], "published_at": r[3]} for r in rows]
-            return ok({"news": news})
+            before = params.get("before") or None
+            try:
+                limit = min(LIST_MAX_LIMIT, max(1, int(params.get("limit", LIST_DEFAULT_LIMIT))))
+                if before:
+                    parse_before(before)
+            except ValueError:
+                return err("Некорректные параметры before или limit")
+
+            page = list_page(conn, before, limit)
+            last_modified = _list_cache["updated_at"]
+            headers = {
+                **cors(),
+                "ETag": page["etag"],
+                "Cache-Control": "public, no-cache",
+                "Access-Control-Expose-Headers": "ETag, Last-Modified",
+            }
+            if last_modified:
+                headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+            if not_modified(event.get("headers") or {}, page["etag"], last_modified):
+                return {"statusCode": 304, "headers": headers, "body": ""}
+            return {"statusCode": 200, "headers": headers, "body": page["body"]}
+
+        if method == "GET" and action == "search":
+            query = (params.get("q") or "").strip()
+            if not query:
+                return err("Параметр q обязателен")
+            try:
+                limit = min(SEARCH_MAX_LIMIT, max(1, int(params.get("limit", SEARCH_DEFAULT_LIMIT))))
+            except ValueError:
+                return err("Параметр limit должен быть целым числом")
+            return ok({"news": search_news(conn, query[:200], limit)})
 
         if method == "GET" and action == "get":
             news_id = int(params.get("id", 0))
             row = conn.execute(text(
-                f"SELECT id, title, content, preview, published_at FROM {SCHEMA}.news WHERE id = :id AND is_published = TRUE"
+                f"SELECT id, title, content, content_html, preview, reading_minutes, published_at "
+                f"FROM {SCHEMA}.news WHERE id = :id AND is_published = TRUE"
             ), {"id": news_id}).fetchone()
             if not row:
                 return err("Новость не найдена", 404)
-            return ok({"news": {"id": row[0], "title": row[1], "content": row[2], "preview": row[3], "published_at": row[4]}})
+            return ok({"news": {
+                "id": row[0], "title": row[1], "content": row[2], "content_html": row[3],
+                "preview": row[4], "reading_minutes": row[5], "published_at": row[6],
+            }})
+
+        if method == "POST" and action == "render":
+            body = json.loads(event.get("body") or "{}")
+            content = text_field(body, "content")
+            if not content:
+                return err("content обязателен")
+            return ok(render(content, text_field(body, "preview")))
 
         if method == "POST" and action == "create":
             body = json.loads(event.get("body") or "{}")
-            title = body.get("title", "").strip()
-            content = body.get("content", "").strip()
+            title = text_field(body, "title")
+            content = text_field(body, "content")
             if not title or not content:
                 return err("title и content обязательны")
-            preview = body.get("preview", content[:150]).strip()
             result = conn.execute(text(
-                f"INSERT INTO {SCHEMA}.news (title, content, preview, is_published) VALUES (:t, :c, :p, TRUE) RETURNING id"
-            ), {"t": title, "c": content, "p": preview})
+                f"INSERT INTO {SCHEMA}.news (title, content, content_html, preview, reading_minutes, is_published) "
+                f"VALUES (:t, :c, :content_html, :preview, :reading_minutes, TRUE) RETURNING id"
+            ), {"t": title, "c": content, **render(content, text_field(body, "preview"))})
+            news_id = result.fetchone()[0]
+            bump_version(conn)
             conn.commit()
-            return ok({"id": result.fetchone()[0], "message": "Новость создана"}, 201)
+            return ok({"id": news_id, "message": "Новость создана"}, 201)
 
         if method == "PUT" and action == "update":
             body = json.loads(event.get("body") or "{}")
             news_id = int(body.get("id", 0))
-            title = body.get("title", "").strip()
-            content = body.get("content", "").strip()
-            preview = body.get("preview", content[:150]).strip()
+            title = text_field(body, "title")
+            content = text_field(body, "content")
             conn.execute(text(
-                f"UPDATE {SCHEMA}.news SET title=:t, content=:c, preview=:p, updated_at=NOW() WHERE id=:id"
-            ), {"t": title, "c": content, "p": preview, "id": news_id})
+                f"UPDATE {SCHEMA}.news SET title=:t, content=:c, content_html=:content_html, preview=:preview, "
+                f"reading_minutes=:reading_minutes, updated_at=NOW() WHERE id=:id"
+            ), {"t": title, "c": content, "id": news_id, **render(content, text_field(body, "preview"))})
+            bump_version(conn)
             conn.commit()
             return ok({"message": "Новость обновлена"})
 
         if method == "DELETE" and action == "delete":
             news_id = int(params.get("id", 0))
             conn.execute(text(f"DELETE FROM {SCHEMA}.news WHERE id = :id"), {"id": news_id})
+            bump_version(conn)
             conn.commit()
             return ok({"message": "Новость удалена"})
 
+        if method == "POST" and action == "rerender":
+            try:
+                batch = min(1000, max(1, int(params.get("batch", RERENDER_BATCH))))
+            except ValueError:
+                return err("Параметр batch должен быть целым числом")
+            return ok({"rerendered": rerender_all(conn, batch)})
+
     return err("Неизвестное действие")
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Обработка текста новости при записи: markdown → безопасный HTML, превью и время чтения.
+
+Поддерживается подмножество markdown: заголовки (#, ##, ###), абзацы, списки
+(- / * / 1.), **жирный**, *курсив*, `код` и ссылки [текст](http/https/mailto).
+Исходный текст сначала целиком экранируется, поэтому в HTML попадают только
+теги, которые порождает сам рендерер.
+"""
+import html
+import re
+import unicodedata
+
+PREVIEW_LENGTH = 150
+WORDS_PER_MINUTE = 180
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.*)$")
+_BULLET_RE = re.compile(r"^[-*]\s+(.*)$")
+_ORDERED_RE = re.compile(r"^\d+[.)]\s+(.*)$")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(((?:https?://|mailto:)[^)\s]+)\)")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC_RE = re.compile(r"(?<![\w*])[*_](?![\s*_])(.+?)(?<![\s*_])[*_](?![\w*])")
+_MARKUP_RE = re.compile(r"^#{1,3}\s+|^[-*]\s+|^\d+[.)]\s+|\*\*|`|(?<![\w*])[*_]|[*_](?![\w*])", re.MULTILINE)
+
+
+def _continues_cluster(ch: str) -> bool:
+    """Символ не начинает новую графему: комбинирующий знак, ZWJ, селектор варианта, тон кожи."""
+    return (
+        unicodedata.combining(ch) > 0
+        or unicodedata.category(ch) in ("Mn", "Me")
+        or ch == "\u200d"
+        or "\ufe00" <= ch <= "\ufe0f"
+        or "\U0001f3fb" <= ch <= "\U0001f3ff"
+    )
+
+
+def _is_regional_indicator(ch: str) -> bool:
+    return "\U0001f1e6" <= ch <= "\U0001f1ff"
+
+
+def _emphasis(text: str) -> str:
+    text = _BOLD_RE.sub(r"<strong>\1</strong>", text)
+    return _ITALIC_RE.sub(r"<em>\1</em>", text)
+
+
+def _inline(text: str) -> str:
+    """Строчная разметка поверх уже экранированного текста."""
+    stashed = []
+
+    def stash(fragment):
+        stashed.append(fragment)
+        return f"\x00{len(stashed) - 1}\x00"
+
+    def restore(fragment):
+        return re.sub(r"\x00(\d+)\x00", lambda m: stashed[int(m.group(1))], fragment)
+
+    text = _CODE_RE.sub(lambda m: stash(f"<code>{m.group(1)}</code>"), text)
+    # Готовая ссылка тоже прячется: * и _ в адресе и в target="_blank" не должны
+    # стать курсивом — выделение применяется только к тексту ссылки
+    text = _LINK_RE.sub(lambda m: stash(
+        f'<a href="{m.group(2)}" rel="nofollow noopener" target="_blank">{restore(_emphasis(m.group(1)))}</a>'
+    ), text)
+    return restore(_emphasis(text))
+
+
+def render_markdown(source: str) -> str:
+    blocks = []
+    paragraph: list[str] = []
+    list_tag, items = None, []
+
+    def flush_paragraph():
+        if paragraph:
+            blocks.append(f"<p>{'<br>'.join(_inline(line) for line in paragraph)}</p>")
+            paragraph.clear()
+
+    def flush_list():
+        nonlocal list_tag
+        if list_tag:
+            blocks.append(f"<{list_tag}>" + "".join(f"<li>{_inline(i)}</li>" for i in items) + f"</{list_tag}>")
+            list_tag = None
+            items.clear()
+
+    # NUL — разделитель заглушек в _inline; из исходного текста его убираем
+    for raw_line in html.escape(source.replace("\x00", ""), quote=True).replace("\r\n", "\n").split("\n"):
+        line = raw_line.strip()
+        if not line:
+            flush_paragraph()
+            flush_list()
+            continue
+        heading = _HEADING_RE.match(line)
+        bullet = _BULLET_RE.match(line)
+        ordered = _ORDERED_RE.match(line)
+        if heading:
+            flush_paragraph()
+            flush_list()
+            level = len(heading.group(1)) + 1
+            blocks.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif bullet or ordered:
+            flush_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                flush_list()
+                list_tag = tag
+            items.append((bullet or ordered).group(1))
+        else:
+            flush_list()
+            paragraph.append(line)
+    flush_paragraph()
+    flush_list()
+    return "\n".join(blocks)
+
+
+def plain_text(source: str) -> str:
+    """Текст без разметки: ссылки заменяются подписью, пробелы схлопываются."""
+    text = _LINK_RE.sub(r"\1", source.replace("\x00", ""))
+    text = _MARKUP_RE.sub("", text)
+    return " ".join(text.split())
+
+
+def make_preview(source: str, limit: int = PREVIEW_LENGTH) -> str:
+    """Превью по границе слова; не разрезает эмодзи и составные символы."""
+    text = plain_text(source)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit + 1)
+    if cut <= 0:
+        # Одно длинное слово — режем по символу, но не внутри графемного кластера
+        cut = limit
+        while cut > 0 and (_continues_cluster(text[cut]) or text[cut - 1] == "\u200d"):
+            cut -= 1
+        flags = 0
+        while flags < cut and _is_regional_indicator(text[cut - flags - 1]):
+            flags += 1
+        cut -= flags % 2
+    return text[:cut].rstrip(" ,.;:—-") + "…"
+
+
+def reading_minutes(source: str) -> int:
+    return max(1, round(len(plain_text(source).split()) / WORDS_PER_MINUTE))
+
+
+def render(content: str, preview: str | None = None) -> dict:
+    """Все производные поля новости для записи в БД."""
+    return {
+        "content_html": render_markdown(content),
+        "preview": preview.strip() if preview and preview.strip() else make_preview(content),
+        "reading_minutes": reading_minutes(content),
+    }
@@ -3,6 +3,8 @@
 Читает события из таблицы events (Transactional Outbox Pattern) —
 аналог консьюмера Kafka. Обрабатывает топики appointment.created,
 appointment.status_changed, appointment.cancelled.
+При отмене записи освободившийся слот сопоставляется с листом ожидания
+(waitlist): первой по очереди подходящей заявке уходит предложение.
 
 Маршруты:
   GET /                        — список уведомлений
@@ -14,11 +16,12 @@ appointment.status_changed, appointment.cancelled.
 import json
 import logging
 
-from datetime import datetime
+from datetime import date, datetime, time
+from sqlalchemy import or_, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 
-from models import Notification, Event, get_session
+from models import Notification, Event, WaitlistEntry, get_session
 from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS
 
 logger = setup_logger("notifications")
@@ -31,6 +34,54 @@ CONSUMED_TOPICS = {
 }
 
 
+def _match_waitlist(session, p: dict) -> Notification | None:
+    """
+    Ищет первую по очереди активную заявку, в окно которой попадает освободившийся слот,
+    и отправляет ей предложение. Один запрос по частичному индексу
+    (specialist_id, date_from, created_at) WHERE status = 'active'; SKIP LOCKED —
+    параллельные консьюмеры не предложат один слот двум пациентам.
+    """
+    # Отмены из-за отпуска врача слот не освобождают — предлагать нечего
+    if p.get("reason") == "specialist_leave" or not p.get("specialist_id"):
+        return None
+    slot_date = date.fromisoformat(p["date"])
+    slot_time = time.fromisoformat(p["time"])
+
+    entry = session.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.specialist_id == int(p["specialist_id"]),
+            WaitlistEntry.status == "active",
+            WaitlistEntry.date_from <= slot_date,
+            WaitlistEntry.date_to >= slot_date,
+            or_(WaitlistEntry.time_from.is_(None), WaitlistEntry.time_from <= slot_time),
+            or_(WaitlistEntry.time_to.is_(None), WaitlistEntry.time_to >= slot_time),
+        )
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if not entry:
+        return None
+
+    entry.status = "offered"
+    entry.offered_date = slot_date
+    entry.offered_time = slot_time
+    entry.offered_at = datetime.utcnow()
+    logger.info(f"Waitlist entry id={entry.id} offered {slot_date} {slot_time}")
+    return Notification(
+        appointment_id=None,
+        type="waitlist",
+        title="Освободилось время",
+        message=(
+            f"{entry.patient_name}, к специалисту {p.get('specialist_name', '')} "
+            f"освободилось время {p['date']} в {p['time']}. Успейте записаться."
+        ),
+        channel="SMS",
+        is_read=False,
+    )
+
+
 def _process_event(session, evt: Event) -> Notification | None:
     """Создаёт уведомление из события очереди."""
     p = evt.payload or {}
@@ -82,6 +133,9 @@ def _process_event(session, evt: Event) -> Notification | None:
             channel="SMS + Email",
             is_read=False,
         )
+        offer = _match_waitlist(session, p)
+        if offer:
+            session.add(offer)
     else:
         logger.warning(f"Unknown topic: {evt.topic}")
         return None
@@ -7,8 +7,8 @@ from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer,
-    JSON, Numeric, String, Text, Time, Date, Index, create_engine
+    BigInteger, Boolean, Column, DateTime, ForeignKey, Integer,
+    JSON, Numeric, String, Text, Time, Date, Index, UniqueConstraint, create_engine, text
 )
 from sqlalchemy.orm import DeclarativeBase, relationship, sessionmaker
 
@@ -56,23 +56,87 @@ class Specialist(Base):
 class Schedule(Base):
     """Слот расписания специалиста."""
     __tablename__ = "schedules"
-    __table_args__ = {"schema": SCHEMA}
+    __table_args__ = (
+        UniqueConstraint("specialist_id", "work_date", "slot_time",
+                         name="schedules_specialist_id_work_date_slot_time_key"),
+        {"schema": SCHEMA},
+    )
 
     id: int = Column(Integer, primary_key=True)
     specialist_id: int = Column(Integer, ForeignKey(f"{SCHEMA}.specialists.id"), nullable=False)
     work_date = Column(Date, nullable=False)
     slot_time = Column(Time, nullable=False)
     is_booked: bool = Column(Boolean, default=False)
+    hold_token: str = Column(String(64), nullable=True)
+    held_until: datetime = Column(DateTime, nullable=True)
 
     specialist = relationship("Specialist", back_populates="schedules")
 
+    def is_held(self) -> bool:
+        return self.held_until is not None and self.held_until > datetime.utcnow()
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "specialist_id": self.specialist_id,
             "date": self.work_date.isoformat(),
             "time": self.slot_time.strftime("%H:%M"),
-            "status": "booked" if self.is_booked else "available",
+            # Удерживаемый другим пациентом слот для остальных выглядит занятым
+            "status": "booked" if self.is_booked or self.is_held() else "available",
+        }
+
+
+class ScheduleTemplate(Base):
+    """Недельный шаблон рабочих часов специалиста (weekday: 0 — понедельник)."""
+    __tablename__ = "schedule_templates"
+    __table_args__ = (
+        Index("idx_schedule_templates_specialist", "specialist_id", "weekday"),
+        {"schema": SCHEMA},
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    specialist_id: int = Column(Integer, ForeignKey(f"{SCHEMA}.specialists.id"), nullable=False)
+    weekday: int = Column(Integer, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes: int = Column(Integer, nullable=False, default=30)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "specialist_id": self.specialist_id,
+            "weekday": self.weekday,
+            "start": self.start_time.strftime("%H:%M"),
+            "end": self.end_time.strftime("%H:%M"),
+            "slot_minutes": self.slot_minutes,
+        }
+
+
+class ScheduleException(Base):
+    """Исключение из шаблона: выходной день (без времени) или закрытый интервал."""
+    __tablename__ = "schedule_exceptions"
+    __table_args__ = (
+        Index("idx_schedule_exceptions_specialist_date", "specialist_id", "work_date"),
+        {"schema": SCHEMA},
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    specialist_id: int = Column(Integer, ForeignKey(f"{SCHEMA}.specialists.id"), nullable=False)
+    work_date = Column(Date, nullable=False)
+    start_time = Column(Time, nullable=True)
+    end_time = Column(Time, nullable=True)
+    reason: str = Column(String(200), nullable=True)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "specialist_id": self.specialist_id,
+            "date": self.work_date.isoformat(),
+            "start": self.start_time.strftime("%H:%M") if self.start_time else None,
+            "end": self.end_time.strftime("%H:%M") if self.end_time else None,
+            "reason": self.reason or "",
         }
 
 
@@ -171,6 +235,118 @@ class Event(Base):
         }
 
 
+class CacheVersion(Base):
+    """Версия набора данных: запись увеличивает её, кэши в процессах сверяются с ней."""
+    __tablename__ = "cache_versions"
+    __table_args__ = {"schema": SCHEMA}
+
+    name: str = Column(String(100), primary_key=True)
+    version: int = Column(BigInteger, nullable=False, default=1)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+
+class WaitlistEntry(Base):
+    """Заявка пациента в лист ожидания: специалист и окно дат/времени."""
+    __tablename__ = "waitlist"
+    __table_args__ = (
+        Index("idx_waitlist_active_match", "specialist_id", "date_from", "created_at",
+              postgresql_where=text("status = 'active'")),
+        {"schema": SCHEMA},
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    specialist_id: int = Column(Integer, ForeignKey(f"{SCHEMA}.specialists.id"), nullable=False)
+    patient_name: str = Column(String(200), nullable=False)
+    patient_phone: str = Column(String(50), nullable=False)
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False)
+    time_from = Column(Time, nullable=True)
+    time_to = Column(Time, nullable=True)
+    status: str = Column(String(20), nullable=False, default="active")
+    offered_date = Column(Date, nullable=True)
+    offered_time = Column(Time, nullable=True)
+    offered_at: datetime = Column(DateTime, nullable=True)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "specialist_id": self.specialist_id,
+            "patient_name": self.patient_name,
+            "date_from": self.date_from.isoformat(),
+            "date_to": self.date_to.isoformat(),
+            "time_from": self.time_from.strftime("%H:%M") if self.time_from else None,
+            "time_to": self.time_to.strftime("%H:%M") if self.time_to else None,
+            "status": self.status,
+            "offered": {
+                "date": self.offered_date.isoformat(),
+                "time": self.offered_time.strftime("%H:%M"),
+            } if self.offered_date and self.offered_time else None,
+        }
+
+
+class IdempotencyKey(Base):
+    """Сохранённый ответ на запрос с заголовком Idempotency-Key."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("idx_idempotency_keys_expires_at", "expires_at"),
+        {"schema": SCHEMA},
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    key: str = Column(String(255), nullable=False, unique=True)
+    request_hash: str = Column(String(64), nullable=False)
+    status_code: int = Column(Integer, nullable=False)
+    response_body: str = Column(Text, nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
+    expires_at: datetime = Column(DateTime, nullable=False)
+
+
+class RevokedToken(Base):
+    """Подписанный токен доступа, отозванный до истечения срока (logout)."""
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index("idx_revoked_tokens_expires_at", "expires_at"),
+        {"schema": SCHEMA},
+    )
+
+    jti: str = Column(String(32), primary_key=True)
+    expires_at: datetime = Column(DateTime, nullable=False)
+    revoked_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+
+class DashboardDaily(Base):
+    """Сводка дня по специалисту для дашборда: статусы записей, выручка, загрузка слотов."""
+    __tablename__ = "dashboard_daily"
+    __table_args__ = (
+        Index("idx_dashboard_daily_day", "day"),
+        {"schema": SCHEMA},
+    )
+
+    specialist_id: int = Column(Integer, ForeignKey(f"{SCHEMA}.specialists.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    pending: int = Column(Integer, nullable=False, default=0)
+    confirmed: int = Column(Integer, nullable=False, default=0)
+    completed: int = Column(Integer, nullable=False, default=0)
+    cancelled: int = Column(Integer, nullable=False, default=0)
+    revenue: int = Column(BigInteger, nullable=False, default=0)
+    slots_total: int = Column(Integer, nullable=False, default=0)
+    slots_booked: int = Column(Integer, nullable=False, default=0)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+
+class ConsumerOffset(Base):
+    """Последнее обработанное событие из events для потребителя, читающего очередь по id."""
+    __tablename__ = "consumer_offsets"
+    __table_args__ = {"schema": SCHEMA}
+
+    consumer: str = Column(String(100), primary_key=True)
+    last_event_id: int = Column(BigInteger, nullable=False, default=0)
+    # Незакрытые дыры ниже last_event_id — см. outbox.EventCursor
+    gaps: dict = Column(JSON, nullable=False, default=dict)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow)
+
+
 def get_engine():
     return create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
 
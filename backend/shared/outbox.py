@@ -0,0 +1,76 @@
+"""
+Чтение очереди events по id для потребителей, которые не пользуются events.status.
+
+id событий выдаются последовательностью при INSERT, а читателю строка видна только
+после COMMIT: событие долгой транзакции (например, генерации слотов) может стать
+видимым уже после того, как потребитель прочитал события с большими id. Поэтому
+курсор хранит не только максимальный прочитанный id, но и «дыры» ниже него —
+id, которых не было в таблице при чтении, — и перечитывает их на каждом проходе,
+пока событие не появится или дыра не устареет (откат транзакции тоже оставляет
+дыру навсегда).
+"""
+import time
+
+from sqlalchemy import func, or_, select
+
+from models import Event
+
+# Дольше любой транзакции, публикующей события, с запасом
+GAP_TIMEOUT_SECONDS = 600
+MAX_GAPS = 5000
+
+
+class EventCursor:
+    """Позиция потребителя: последний прочитанный id и ещё не закрытые дыры ниже него."""
+
+    def __init__(self, last_event_id: int = 0, gaps: dict | None = None):
+        self.last_event_id = int(last_event_id or 0)
+        # id дыры → время (unix), когда её заметили
+        self.gaps: dict[int, float] = {int(k): float(v) for k, v in (gaps or {}).items()}
+
+    @classmethod
+    def at_head(cls, session) -> "EventCursor":
+        """
+        Курсор на конце очереди (для полной перестройки состояния потребителя).
+        Отсутствующие id в хвосте очереди считаются дырами: это могут быть ещё
+        не закоммиченные события, которых не видно и в перечитанных таблицах.
+        """
+        last = session.execute(select(func.coalesce(func.max(Event.id), 0))).scalar()
+        tail_from = max(1, last - MAX_GAPS + 1)
+        present = set(session.execute(select(Event.id).where(Event.id >= tail_from)).scalars())
+        now = time.time()
+        return cls(last, {i: now for i in range(tail_from, last + 1) if i not in present})
+
+    def fetch(self, session, limit: int) -> list[tuple[int, str, dict]]:
+        """
+        Следующая пачка (id, topic, payload): появившиеся дыры и события после last_event_id.
+        Топики не фильтруются в SQL — иначе id чужих топиков выглядели бы как дыры.
+        """
+        self._expire(time.time())
+        condition = Event.id > self.last_event_id
+        if self.gaps:
+            condition = or_(condition, Event.id.in_(sorted(self.gaps)))
+        rows = session.execute(
+            select(Event.id, Event.topic, Event.payload).where(condition).order_by(Event.id).limit(limit)
+        ).all()
+        return [(evt_id, topic, payload or {}) for evt_id, topic, payload in rows]
+
+    def advance(self, event_ids: list[int]) -> None:
+        """Отмечает события обработанными; пропуски между ними запоминаются как дыры."""
+        now = time.time()
+        for evt_id in event_ids:
+            self.gaps.pop(evt_id, None)
+        for evt_id in sorted(i for i in event_ids if i > self.last_event_id):
+            for missing in range(max(self.last_event_id + 1, evt_id - MAX_GAPS), evt_id):
+                self.gaps[missing] = now
+            self.last_event_id = evt_id
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        self.gaps = {i: seen for i, seen in self.gaps.items() if now - seen < GAP_TIMEOUT_SECONDS}
+        if len(self.gaps) > MAX_GAPS:
+            self.gaps = dict(sorted(self.gaps.items())[-MAX_GAPS:])
+
+    def state(self) -> dict:
+        """Состояние для сохранения в consumer_offsets (ключи JSON — строки)."""
+        return {"last_event_id": self.last_event_id, "gaps": {str(i): seen for i, seen in self.gaps.items()}}
@@ -0,0 +1,217 @@
+"""
+Компактный индекс доступности слотов в памяти процесса.
+
+Каждый день специалиста хранится двумя битовыми масками над фиксированной
+сеткой позиций (шаг SLOT_STEP_MINUTES): «слот существует» и «слот свободен».
+Индекс строится из schedules и догоняет изменения по событиям из events
+(appointment.created / appointment.cancelled / schedule.changed). Ответы на
+«свободные слоты», «есть ли свободное» и «ближайшее свободное» сводятся
+к битовым операциям.
+
+События читаются курсором outbox.EventCursor: он перечитывает id, которые
+закоммитились позже событий с большими id, поэтому такие события не теряются.
+
+Удержания слотов (hold) индекс не учитывает — только is_booked.
+"""
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from models import Schedule
+from outbox import EventCursor
+
+SLOT_STEP_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_STEP_MINUTES
+HORIZON_DAYS = 90
+EVENTS_BATCH = 1000
+
+TOPIC_CREATED = "appointment.created"
+TOPIC_CANCELLED = "appointment.cancelled"
+TOPIC_SCHEDULE_CHANGED = "schedule.changed"
+INDEXED_TOPICS = (TOPIC_CREATED, TOPIC_CANCELLED, TOPIC_SCHEDULE_CHANGED)
+
+
+def slot_position(t: time) -> int:
+    return (t.hour * 60 + t.minute) // SLOT_STEP_MINUTES
+
+
+def position_time(pos: int) -> time:
+    minutes = pos * SLOT_STEP_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def window_mask(time_from: time | None = None, time_to: time | None = None) -> int:
+    """Маска позиций в окне [time_from, time_to] включительно."""
+    lo = slot_position(time_from) if time_from else 0
+    hi = slot_position(time_to) if time_to else SLOTS_PER_DAY - 1
+    if hi < lo:
+        return 0
+    return ((1 << (hi - lo + 1)) - 1) << lo
+
+
+def mask_times(mask: int) -> list[time]:
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(position_time(low.bit_length() - 1))
+        mask ^= low
+    return result
+
+
+class AvailabilityIndex:
+    """Битовый индекс (specialist_id, day) → маски слотов на горизонте HORIZON_DAYS."""
+
+    def __init__(self):
+        self._slots: dict[tuple[int, date], int] = {}
+        self._free: dict[tuple[int, date], int] = {}
+        self._lock = threading.Lock()
+        self.window: tuple[date, date] | None = None
+        self.cursor = EventCursor()
+        self.built_at: datetime | None = None
+
+    # --- построение и синхронизация ---
+
+    @staticmethod
+    def _load_masks(session, specialist_id: int | None, date_from: date, date_to: date):
+        stmt = (
+            select(Schedule.specialist_id, Schedule.work_date, Schedule.slot_time, Schedule.is_booked)
+            .where(Schedule.work_date.between(date_from, date_to))
+        )
+        if specialist_id is not None:
+            stmt = stmt.where(Schedule.specialist_id == specialist_id)
+
+        slots: dict[tuple[int, date], int] = {}
+        free: dict[tuple[int, date], int] = {}
+        for sid, work_date, slot_time, is_booked in session.execute(stmt):
+            key = (sid, work_date)
+            bit = 1 << slot_position(slot_time)
+            slots[key] = slots.get(key, 0) | bit
+            if not is_booked:
+                free[key] = free.get(key, 0) | bit
+        return slots, free
+
+    def rebuild(self, session, date_from: date | None = None, days: int = HORIZON_DAYS) -> dict:
+        """Полная перестройка индекса из schedules."""
+        date_from = date_from or date.today()
+        date_to = date_from + timedelta(days=days - 1)
+        # Позицию очереди фиксируем до чтения слотов: события после неё и ещё не
+        # закоммиченные события из хвоста будут применены повторно, а установка/сброс бита идемпотентны
+        cursor = EventCursor.at_head(session)
+        slots, free = self._load_masks(session, None, date_from, date_to)
+        with self._lock:
+            self._slots, self._free = slots, free
+            self.window = (date_from, date_to)
+            self.cursor = cursor
+            self.built_at = datetime.utcnow()
+        return self.stats()
+
+    def reload_days(self, session, specialist_id: int, date_from: date, date_to: date) -> None:
+        """Перечитывает из schedules дни одного специалиста (после массовых изменений слотов)."""
+        if not self.window:
+            return
+        date_from, date_to = max(date_from, self.window[0]), min(date_to, self.window[1])
+        if date_to < date_from:
+            return
+        slots, free = self._load_masks(session, specialist_id, date_from, date_to)
+        with self._lock:
+            day = date_from
+            while day <= date_to:
+                key = (specialist_id, day)
+                self._slots.pop(key, None)
+                self._free.pop(key, None)
+                day += timedelta(days=1)
+            self._slots.update(slots)
+            self._free.update(free)
+
+    def apply_event(self, session, topic: str, payload: dict) -> None:
+        sid = payload.get("specialist_id")
+        if sid is None:
+            return
+        if topic == TOPIC_SCHEDULE_CHANGED:
+            self.reload_days(session, int(sid), date.fromisoformat(payload["date_from"]),
+                             date.fromisoformat(payload["date_to"]))
+            return
+
+        key = (int(sid), date.fromisoformat(payload["date"]))
+        bit = 1 << slot_position(time.fromisoformat(payload["time"]))
+        with self._lock:
+            if not self._slots.get(key, 0) & bit:
+                return
+            if topic == TOPIC_CREATED:
+                self._free[key] = self._free.get(key, 0) & ~bit
+            elif topic == TOPIC_CANCELLED:
+                self._free[key] = self._free.get(key, 0) | bit
+
+    def refresh(self, session) -> int:
+        """Догоняет индекс по новым событиям и по событиям, закоммиченным позже соседних."""
+        applied = 0
+        while True:
+            events = self.cursor.fetch(session, EVENTS_BATCH)
+            for _, topic, payload in events:
+                if topic in INDEXED_TOPICS:
+                    self.apply_event(session, topic, payload)
+                    applied += 1
+            self.cursor.advance([evt_id for evt_id, _, _ in events])
+            if len(events) < EVENTS_BATCH:
+                return applied
+
+    def ensure_fresh(self, session) -> None:
+        """Строит индекс при первом обращении и при смене дня, иначе догоняет по событиям."""
+        if not self.window or self.window[0] != date.today():
+            self.rebuild(session)
+        else:
+            self.refresh(session)
+
+    def check(self, session) -> list[dict]:
+        """Сверяет индекс с таблицей schedules, возвращает расхождения."""
+        if not self.window:
+            return []
+        slots, free = self._load_masks(session, None, *self.window)
+        mismatches = []
+        with self._lock:
+            for key in set(slots) | set(self._slots):
+                if slots.get(key, 0) != self._slots.get(key, 0) or free.get(key, 0) != self._free.get(key, 0):
+                    mismatches.append({
+                        "specialist_id": key[0],
+                        "date": key[1].isoformat(),
+                        "index_free": [t.strftime("%H:%M") for t in mask_times(self._free.get(key, 0))],
+                        "table_free": [t.strftime("%H:%M") for t in mask_times(free.get(key, 0))],
+                    })
+        return mismatches
+
+    # --- запросы ---
+
+    def covers(self, date_from: date, date_to: date) -> bool:
+        return bool(self.window) and self.window[0] <= date_from and date_to <= self.window[1]
+
+    def free_mask(self, specialist_id: int, day: date) -> int:
+        return self._free.get((specialist_id, day), 0)
+
+    def free_slots(self, specialist_id: int, day: date,
+                   time_from: time | None = None, time_to: time | None = None) -> list[time]:
+        return mask_times(self.free_mask(specialist_id, day) & window_mask(time_from, time_to))
+
+    def any_free(self, specialist_id: int, date_from: date, date_to: date,
+                 time_from: time | None = None, time_to: time | None = None) -> bool:
+        return self.earliest_free(specialist_id, date_from, date_to, time_from, time_to) is not None
+
+    def earliest_free(self, specialist_id: int, date_from: date, date_to: date,
+                      time_from: time | None = None, time_to: time | None = None) -> tuple[date, time] | None:
+        window = window_mask(time_from, time_to)
+        day = date_from
+        while day <= date_to:
+            mask = self._free.get((specialist_id, day), 0) & window
+            if mask:
+                return day, position_time((mask & -mask).bit_length() - 1)
+            day += timedelta(days=1)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "days": len(self._slots),
+            "window": [d.isoformat() for d in self.window] if self.window else None,
+            "last_event_id": self.cursor.last_event_id,
+            "pending_gaps": len(self.cursor.gaps),
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+        }
@@ -2,23 +2,292 @@
 Микросервис специалистов (Python 3.11, SQLAlchemy ORM).
 
 Маршруты:
-  GET /                                   — список всех специалистов
+  GET /                                   — список всех специалистов (кэш в процессе + ETag)
+  GET /?specialty=&min_price=&max_price=&available=&sort=rating|price&limit=&cursor=
+                                          — страница каталога с фильтрами (keyset-пагинация)
+  GET /?action=search&q=Q[&limit=]       — поиск по имени и специальности (pg_trgm), с ранжированием
   GET /?specialist_id=N&date=YYYY-MM-DD   — слоты расписания специалиста на дату
+  GET /?specialist_id=N&from=&to=         — сетка свободных/занятых слотов за период (до 62 дней)
+  GET /?specialist_ids=1,2,3&date=|from=&to=
+                                          — сетки нескольких специалистов одним запросом
+  GET /?action=first_available&specialty=S[&from=&to=&time_from=&time_to=&limit=]
+                                          — ближайшие свободные слоты у всех врачей специальности
+  GET /?action=availability&specialist_id=N&from=&to=[&time_from=&time_to=]
+                                          — свободные слоты из битового индекса в памяти
+  POST /?action=availability_rebuild      — перестроить индекс доступности
+  GET /?action=availability_check         — сверить индекс с таблицей schedules
   GET /?specialist_id=N                   — карточка одного специалиста
   POST /                                  — создать специалиста
   PUT /?id=N                              — обновить специалиста
+  GET /?action=templates&specialist_id=N  — недельный шаблон и ближайшие исключения
+  PUT /?action=templates&specialist_id=N  — заменить недельный шаблон {templates: [...]}
+  POST /?action=exceptions                — выходной/закрытый интервал {specialist_id, date, start, end}
+  POST /?action=generate_slots            — развернуть шаблоны в слоты {specialist_ids, weeks, from}
+  POST /?action=leave                     — отпуск: отменить записи и убрать/освободить слоты за период
+                                            {specialist_id, from, to, slots: delete|release, unavailable}
+                                            (дни раньше сегодняшнего не затрагиваются)
 """
+import hashlib
 import json
 import logging
+import time
 
-from datetime import date as date_type
+from datetime import date as date_type, datetime, time as time_type, timedelta
+from decimal import Decimal
+from sqlalchemy import delete, false, func, insert, or_, select, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
-from models import Specialist, Schedule, get_session
+from availability import AvailabilityIndex, TOPIC_CANCELLED, TOPIC_SCHEDULE_CHANGED
+from models import (
+    Appointment, Specialist, Schedule, ScheduleTemplate, ScheduleException, Event, CacheVersion, get_session
+)
+from schedule_generator import MAX_WEEKS, generate_slots
 from utils import setup_logger, ok, error, handle_exception, CORS_HEADERS
 
 logger = setup_logger("specialists")
 
+SERVICE_NAME = "specialists"
+
+_availability = AvailabilityIndex()
+
+CATALOGUE_CACHE_NAME = "specialists"
+# Как часто тёплый инстанс сверяет версию каталога с БД; между сверками БД не трогается
+CATALOGUE_VERSION_CHECK_SECONDS = 5
+_catalogue = {"version": None, "checked_at": 0.0, "body": None, "etag": None}
+
+CATALOGUE_FILTER_PARAMS = ("specialty", "min_price", "max_price", "available", "sort", "limit", "cursor")
+CATALOGUE_SORTS = ("id", "rating", "price")
+CATALOGUE_DEFAULT_LIMIT = 20
+CATALOGUE_MAX_LIMIT = 100
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_QUERY_LENGTH = 100
+
+LEAVE_CANCELLABLE_STATUSES = ("pending", "confirmed")
+LEAVE_SLOT_MODES = ("delete", "release")
+LEAVE_MAX_DAYS = 366
+
+GRID_MAX_DAYS = 62
+GRID_MAX_SPECIALISTS = 20
+FIRST_AVAILABLE_DEFAULT_DAYS = 30
+FIRST_AVAILABLE_MAX_LIMIT = 50
+
+
+def _publish_events(session, topic: str, payloads: list[dict]) -> None:
+    """Публикует пачку событий одним multi-row INSERT (Transactional Outbox)."""
+    if not payloads:
+        return
+    session.execute(insert(Event).values([
+        {"topic": topic, "payload": p, "produced_by": SERVICE_NAME, "status": "pending"}
+        for p in payloads
+    ]))
+    logger.info(f"Events published: topic={topic} count={len(payloads)}")
+
+
+def _bump_catalogue_version(session) -> None:
+    """Увеличивает версию каталога в текущей транзакции — кэши других инстансов устареют."""
+    result = session.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == CATALOGUE_CACHE_NAME)
+        .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        session.add(CacheVersion(name=CATALOGUE_CACHE_NAME, version=1))
+    _catalogue["checked_at"] = 0.0
+
+
+def _catalogue_response(session, if_none_match: str | None) -> dict:
+    """Готовое тело каталога из кэша процесса; пересобирается только при смене версии."""
+    now = time.monotonic()
+    if _catalogue["body"] is None or now - _catalogue["checked_at"] >= CATALOGUE_VERSION_CHECK_SECONDS:
+        version = session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == CATALOGUE_CACHE_NAME)
+        ).scalar()
+        _catalogue["checked_at"] = now
+        if _catalogue["body"] is None or version != _catalogue["version"]:
+            specialists = session.query(Specialist).order_by(Specialist.id).all()
+            body = json.dumps({"specialists": [s.to_dict() for s in specialists]}, ensure_ascii=False)
+            _catalogue.update(
+                version=version,
+                body=body,
+                etag=f'"{hashlib.sha1(body.encode()).hexdigest()}"',
+            )
+            logger.info(f"Specialists catalogue rebuilt: version={version} records={len(specialists)}")
+
+    headers = {
+        **CORS_HEADERS,
+        "ETag": _catalogue["etag"],
+        "Cache-Control": "no-cache",
+        "Access-Control-Expose-Headers": "ETag",
+    }
+    if if_none_match and if_none_match == _catalogue["etag"]:
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    return {"statusCode": 200, "headers": headers, "body": _catalogue["body"]}
+
+
+def _catalogue_page(session, params: dict) -> tuple[list[Specialist], str | None]:
+    """
+    Страница каталога по фильтрам с keyset-пагинацией.
+    Порядок: rating — (rating DESC, id DESC), price — (price, id), по умолчанию id;
+    курсор — значения ключа сортировки последней строки страницы.
+    """
+    sort = params.get("sort") or "id"
+    if sort not in CATALOGUE_SORTS:
+        raise ValueError(f"Параметр sort должен быть одним из: {', '.join(CATALOGUE_SORTS)}")
+    try:
+        limit = min(CATALOGUE_MAX_LIMIT, max(1, int(params.get("limit", CATALOGUE_DEFAULT_LIMIT))))
+        min_price = int(params["min_price"]) if params.get("min_price") else None
+        max_price = int(params["max_price"]) if params.get("max_price") else None
+    except ValueError:
+        raise ValueError("Параметры limit, min_price и max_price должны быть целыми числами")
+
+    stmt = select(Specialist)
+    if params.get("specialty"):
+        # lower(specialty) = lower(:s) — совпадает с функциональными индексами миграции
+        stmt = stmt.where(func.lower(Specialist.specialty) == params["specialty"].strip().lower())
+    if min_price is not None:
+        stmt = stmt.where(Specialist.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Specialist.price <= max_price)
+    if params.get("available") in ("true", "1"):
+        stmt = stmt.where(Specialist.is_available == True)  # noqa: E712
+    elif params.get("available") in ("false", "0"):
+        stmt = stmt.where(Specialist.is_available == False)  # noqa: E712
+
+    cursor = params.get("cursor")
+    try:
+        if sort == "rating":
+            stmt = stmt.order_by(Specialist.rating.desc(), Specialist.id.desc())
+            if cursor:
+                raw_rating, raw_id = cursor.split("|")
+                stmt = stmt.where(tuple_(Specialist.rating, Specialist.id) < (Decimal(raw_rating), int(raw_id)))
+        elif sort == "price":
+            stmt = stmt.order_by(Specialist.price, Specialist.id)
+            if cursor:
+                raw_price, raw_id = cursor.split("|")
+                stmt = stmt.where(tuple_(Specialist.price, Specialist.id) > (int(raw_price), int(raw_id)))
+        else:
+            stmt = stmt.order_by(Specialist.id)
+            if cursor:
+                stmt = stmt.where(Specialist.id > int(cursor))
+    except (ValueError, ArithmeticError):
+        raise ValueError("Некорректный cursor")
+
+    # Берём на одну строку больше — так без COUNT(*) известно, есть ли следующая страница
+    rows = session.execute(stmt.limit(limit + 1)).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = {"rating": f"{last.rating}|{last.id}", "price": f"{last.price}|{last.id}"}.get(sort, str(last.id))
+    return rows, next_cursor
+
+
+def _search_specialists(session, query: str, limit: int) -> list[tuple[Specialist, float]]:
+    """
+    Поиск специалистов по подстроке/похожему слову в имени и специальности.
+    В Postgres — ILIKE и word_similarity (колонка %> запрос) по GIN-индексам pg_trgm, ранжирование
+    по наибольшему сходству; на других СУБД — подстрока без учёта регистра в Python.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        needle = query.casefold()
+        found = []
+        for spec in session.execute(select(Specialist)).scalars():
+            positions = [p for p in (spec.name.casefold().find(needle), spec.specialty.casefold().find(needle)) if p >= 0]
+            if positions:
+                found.append((spec, 1.0 / (1 + min(positions))))
+        found.sort(key=lambda item: (-item[1], item[0].id))
+        return found[:limit]
+
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rank = func.greatest(func.word_similarity(query, Specialist.name),
+                         func.word_similarity(query, Specialist.specialty))
+    stmt = (
+        select(Specialist, rank.label("rank"))
+        .where(or_(
+            Specialist.name.ilike(pattern),
+            Specialist.specialty.ilike(pattern),
+            Specialist.name.bool_op("%>")(query),
+            Specialist.specialty.bool_op("%>")(query),
+        ))
+        .order_by(rank.desc(), Specialist.id)
+        .limit(limit)
+    )
+    return [(spec, float(score)) for spec, score in session.execute(stmt)]
+
+
+def _cancel_appointments_in_period(session, spec: Specialist, date_from, date_to) -> list[dict]:
+    """
+    Отменяет активные записи специалиста за период одним UPDATE ... FROM ... RETURNING.
+    Подзапрос с FOR UPDATE блокирует строки и отдаёт старый статус до обновления.
+    """
+    old = (
+        select(Appointment.id, Appointment.status)
+        .where(
+            Appointment.specialist_id == spec.id,
+            Appointment.appointment_date.between(date_from, date_to),
+            Appointment.status.in_(LEAVE_CANCELLABLE_STATUSES),
+        )
+        .with_for_update()
+        .subquery("old")
+    )
+    stmt = (
+        update(Appointment)
+        .where(Appointment.id == old.c.id)
+        .values(status="cancelled")
+        .returning(Appointment.id, Appointment.patient_name, Appointment.appointment_date,
+                   Appointment.appointment_time, old.c.status)
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        {"appointment_id": apt_id, "specialist_id": spec.id, "patient_name": patient_name,
+         "specialist_name": spec.name, "date": apt_date.isoformat(), "time": apt_time.strftime("%H:%M"),
+         "old_status": old_status, "reason": "specialist_leave"}
+        for apt_id, patient_name, apt_date, apt_time, old_status in session.execute(stmt).all()
+    ]
+
+
+def _parse_template(raw: dict, specialist_id: int) -> ScheduleTemplate:
+    weekday = int(raw["weekday"])
+    start = time_type.fromisoformat(str(raw["start"]))
+    end = time_type.fromisoformat(str(raw["end"]))
+    slot_minutes = int(raw.get("slot_minutes", 30))
+    if not 0 <= weekday <= 6 or end <= start or slot_minutes <= 0:
+        raise ValueError
+    return ScheduleTemplate(specialist_id=specialist_id, weekday=weekday,
+                            start_time=start, end_time=end, slot_minutes=slot_minutes)
+
+
+def _slot_grids(session, specialist_ids: list[int], date_from, date_to) -> dict[int, list[dict]]:
+    """
+    Сетки слотов нескольких специалистов за период одним запросом
+    specialist_id IN (...) по уникальному индексу (specialist_id, work_date, slot_time).
+    Читаются только нужные колонки.
+    """
+    rows = session.execute(
+        select(Schedule.specialist_id, Schedule.work_date, Schedule.slot_time, Schedule.is_booked,
+               Schedule.held_until)
+        .where(
+            Schedule.specialist_id.in_(specialist_ids),
+            Schedule.work_date.between(date_from, date_to),
+        )
+        .order_by(Schedule.specialist_id, Schedule.work_date, Schedule.slot_time)
+    ).all()
+
+    now = datetime.utcnow()
+    period = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    grids = {sid: {d: {"available": [], "booked": []} for d in period} for sid in specialist_ids}
+    for sid, work_date, slot_time, is_booked, held_until in rows:
+        taken = is_booked or (held_until is not None and held_until > now)
+        grids[sid][work_date]["booked" if taken else "available"].append(slot_time.strftime("%H:%M"))
+    return {sid: [{"date": d.isoformat(), **slots} for d, slots in days.items()] for sid, days in grids.items()}
+
+
+def _slot_grid(session, specialist_id: int, date_from, date_to) -> list[dict]:
+    """Сетка слотов одного специалиста за период."""
+    return _slot_grids(session, [specialist_id], date_from, date_to)[specialist_id]
+
 
 def handler(event: dict, context) -> dict:
     """Обработчик микросервиса специалистов."""
@@ -35,11 +304,351 @@ def handler(event: dict, context) -> dict:
     try:
         session = get_session()
 
+        # GET — поиск по имени и специальности
+        if method == "GET" and params.get("action") == "search":
+            query = (params.get("q") or "").strip()
+            if not query:
+                return error("Параметр q обязателен")
+            if len(query) > SEARCH_MAX_QUERY_LENGTH:
+                return error(f"Параметр q не длиннее {SEARCH_MAX_QUERY_LENGTH} символов")
+            try:
+                limit = min(SEARCH_MAX_LIMIT, max(1, int(params.get("limit", SEARCH_DEFAULT_LIMIT))))
+            except ValueError:
+                return error("Параметр limit должен быть целым числом")
+
+            found = _search_specialists(session, query, limit)
+            logger.info(f"Specialists search q={query!r}: {len(found)} results")
+            return ok({"specialists": [{**spec.to_dict(), "score": round(score, 3)} for spec, score in found]})
+
+        # GET — ближайшие свободные слоты по специальности
+        if method == "GET" and params.get("action") == "first_available":
+            specialty = (params.get("specialty") or "").strip()
+            if not specialty:
+                return error("Параметр specialty обязателен")
+            try:
+                date_from = date_type.fromisoformat(params["from"]) if params.get("from") else date_type.today()
+                date_to = (date_type.fromisoformat(params["to"]) if params.get("to")
+                           else date_from + timedelta(days=FIRST_AVAILABLE_DEFAULT_DAYS))
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            try:
+                time_from = time_type.fromisoformat(params["time_from"]) if params.get("time_from") else None
+                time_to = time_type.fromisoformat(params["time_to"]) if params.get("time_to") else None
+            except ValueError:
+                return error("Неверный формат времени. Ожидается HH:MM")
+            try:
+                limit = min(FIRST_AVAILABLE_MAX_LIMIT, max(1, int(params.get("limit", 5))))
+            except ValueError:
+                return error("Параметр limit должен быть целым числом")
+
+            now = datetime.utcnow()
+            # is_booked == False (а не IS FALSE) — чтобы планировщик выбрал частичный индекс
+            stmt = (
+                select(Schedule.specialist_id, Schedule.work_date, Schedule.slot_time,
+                       Specialist.name, Specialist.specialty, Specialist.emoji)
+                .join(Specialist, Specialist.id == Schedule.specialist_id)
+                .where(
+                    Schedule.is_booked == False,  # noqa: E712
+                    Schedule.work_date.between(date_from, date_to),
+                    or_(Schedule.held_until.is_(None), Schedule.held_until <= now),
+                    func.lower(Specialist.specialty) == specialty.lower(),
+                    Specialist.is_available == True,  # noqa: E712
+                )
+                .order_by(Schedule.work_date, Schedule.slot_time, Schedule.specialist_id)
+                .limit(limit)
+            )
+            if time_from:
+                stmt = stmt.where(Schedule.slot_time >= time_from)
+            if time_to:
+                stmt = stmt.where(Schedule.slot_time <= time_to)
+
+            slots = [
+                {"specialist_id": sid, "date": work_date.isoformat(), "time": slot_time.strftime("%H:%M"),
+                 "doctor": name, "specialty": spec_name, "emoji": emoji}
+                for sid, work_date, slot_time, name, spec_name, emoji in session.execute(stmt)
+            ]
+            logger.info(f"First available specialty={specialty}: {len(slots)} slots")
+            return ok({"slots": slots})
+
+        # GET — свободные слоты из битового индекса
+        if method == "GET" and params.get("action") == "availability":
+            specialist_id = params.get("specialist_id")
+            if not specialist_id:
+                return error("Параметр specialist_id обязателен")
+            try:
+                date_from = date_type.fromisoformat(params["from"]) if params.get("from") else date_type.today()
+                date_to = date_type.fromisoformat(params["to"]) if params.get("to") else date_from
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            try:
+                time_from = time_type.fromisoformat(params["time_from"]) if params.get("time_from") else None
+                time_to = time_type.fromisoformat(params["time_to"]) if params.get("time_to") else None
+            except ValueError:
+                return error("Неверный формат времени. Ожидается HH:MM")
+
+            _availability.ensure_fresh(session)
+            if not _availability.covers(date_from, date_to):
+                return error("Период вне горизонта индекса доступности")
+
+            sid = int(specialist_id)
+            earliest = _availability.earliest_free(sid, date_from, date_to, time_from, time_to)
+            days = []
+            day = date_from
+            while day <= date_to:
+                free = _availability.free_slots(sid, day, time_from, time_to)
+                days.append({"date": day.isoformat(), "free": [t.strftime("%H:%M") for t in free]})
+                day += timedelta(days=1)
+            return ok({
+                "specialist_id": sid,
+                "any_free": earliest is not None,
+                "earliest": {"date": earliest[0].isoformat(), "time": earliest[1].strftime("%H:%M")} if earliest else None,
+                "days": days,
+            })
+
+        # GET — сверка индекса доступности с таблицей
+        if method == "GET" and params.get("action") == "availability_check":
+            _availability.ensure_fresh(session)
+            mismatches = _availability.check(session)
+            if mismatches:
+                logger.warning(f"Availability index mismatches: {len(mismatches)}")
+            return ok({"consistent": not mismatches, "mismatches": mismatches[:100],
+                       "index": _availability.stats()})
+
+        # POST — перестроить индекс доступности
+        if method == "POST" and params.get("action") == "availability_rebuild":
+            stats = _availability.rebuild(session)
+            logger.info(f"Availability index rebuilt: {stats}")
+            return ok({"index": stats})
+
+        # GET — недельный шаблон специалиста
+        if method == "GET" and params.get("action") == "templates":
+            specialist_id = params.get("specialist_id")
+            if not specialist_id:
+                return error("Параметр specialist_id обязателен")
+            templates = (
+                session.query(ScheduleTemplate)
+                .filter_by(specialist_id=int(specialist_id))
+                .order_by(ScheduleTemplate.weekday, ScheduleTemplate.start_time)
+                .all()
+            )
+            exceptions = (
+                session.query(ScheduleException)
+                .filter_by(specialist_id=int(specialist_id))
+                .filter(ScheduleException.work_date >= date_type.today())
+                .order_by(ScheduleException.work_date)
+                .all()
+            )
+            return ok({"templates": [t.to_dict() for t in templates],
+                       "exceptions": [e.to_dict() for e in exceptions]})
+
+        # PUT — заменить недельный шаблон
+        if method == "PUT" and params.get("action") == "templates":
+            specialist_id = params.get("specialist_id")
+            if not specialist_id:
+                return error("Параметр specialist_id обязателен")
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+            if not isinstance(body.get("templates"), list):
+                return error("Поле templates должно быть списком")
+
+            spec = session.get(Specialist, int(specialist_id))
+            if not spec:
+                return error("Специалист не найден", status=404)
+            try:
+                templates = [_parse_template(t, spec.id) for t in body["templates"]]
+            except (KeyError, ValueError, TypeError):
+                return error("Интервал шаблона: weekday 0–6, start < end (HH:MM), slot_minutes > 0")
+
+            session.execute(delete(ScheduleTemplate).where(ScheduleTemplate.specialist_id == spec.id))
+            session.add_all(templates)
+            session.commit()
+            logger.info(f"Replaced schedule template specialist={spec.id}: {len(templates)} intervals")
+            return ok({"templates": [t.to_dict() for t in templates]})
+
+        # POST — исключение из шаблона
+        if method == "POST" and params.get("action") == "exceptions":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+            required = ["specialist_id", "date"]
+            missing = [f for f in required if not body.get(f)]
+            if missing:
+                return error(f"Отсутствуют обязательные поля: {', '.join(missing)}")
+            try:
+                exc_date = date_type.fromisoformat(str(body["date"]))
+                start = time_type.fromisoformat(body["start"]) if body.get("start") else None
+                end = time_type.fromisoformat(body["end"]) if body.get("end") else None
+            except ValueError:
+                return error("Ожидается date — YYYY-MM-DD, start/end — HH:MM")
+            if (start is None) != (end is None) or (start and end <= start):
+                return error("Укажите оба поля start и end (start < end) или ни одного")
+
+            spec = session.get(Specialist, int(body["specialist_id"]))
+            if not spec:
+                return error("Специалист не найден", status=404)
+
+            exc = ScheduleException(specialist_id=spec.id, work_date=exc_date, start_time=start,
+                                    end_time=end, reason=str(body.get("reason", ""))[:200] or None)
+            session.add(exc)
+
+            # Уже сгенерированные свободные слоты в интервале исключения убираем
+            stmt = delete(Schedule).where(
+                Schedule.specialist_id == spec.id,
+                Schedule.work_date == exc_date,
+                Schedule.is_booked == False,  # noqa: E712
+            )
+            if start:
+                stmt = stmt.where(Schedule.slot_time >= start, Schedule.slot_time < end)
+            removed = session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+            _publish_events(session, TOPIC_SCHEDULE_CHANGED, [{
+                "specialist_id": spec.id, "date_from": exc_date.isoformat(), "date_to": exc_date.isoformat(),
+            }])
+            session.commit()
+            logger.info(f"Schedule exception specialist={spec.id} {exc_date}: removed {removed} free slots")
+            return ok({"exception": exc.to_dict(), "removed_slots": removed}, status=201)
+
+        # POST — генерация слотов по шаблонам
+        if method == "POST" and params.get("action") == "generate_slots":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+            try:
+                weeks = int(body.get("weeks", 4))
+                date_from = date_type.fromisoformat(body["from"]) if body.get("from") else date_type.today()
+                specialist_ids = [int(i) for i in body.get("specialist_ids") or []]
+            except (ValueError, TypeError):
+                return error("Ожидается weeks — целое число, from — YYYY-MM-DD, specialist_ids — список id")
+            if not 1 <= weeks <= MAX_WEEKS:
+                return error(f"Параметр weeks должен быть от 1 до {MAX_WEEKS}")
+
+            generated = generate_slots(session, specialist_ids or None, date_from, weeks)
+            _publish_events(session, TOPIC_SCHEDULE_CHANGED, [
+                {"specialist_id": g["specialist_id"], "date_from": g["date_from"], "date_to": g["date_to"]}
+                for g in generated
+            ])
+            session.commit()
+            total = sum(g["inserted"] for g in generated)
+            logger.info(f"Generated {total} slots for {len(generated)} specialists, {weeks} weeks from {date_from}")
+            return ok({"inserted": total, "specialists": generated})
+
+        # POST — отпуск/недоступность специалиста за период
+        if method == "POST" and params.get("action") == "leave":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error("Тело запроса должно быть валидным JSON")
+            required = ["specialist_id", "from", "to"]
+            missing = [f for f in required if not body.get(f)]
+            if missing:
+                return error(f"Отсутствуют обязательные поля: {', '.join(missing)}")
+            try:
+                date_from = date_type.fromisoformat(str(body["from"]))
+                date_to = date_type.fromisoformat(str(body["to"]))
+            except ValueError:
+                return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+            if date_to < date_from:
+                return error("Дата to не может быть раньше from")
+            if (date_to - date_from).days >= LEAVE_MAX_DAYS:
+                return error(f"Период не может превышать {LEAVE_MAX_DAYS} дней")
+            slot_mode = body.get("slots", "delete")
+            if slot_mode not in LEAVE_SLOT_MODES:
+                return error(f"Поле slots должно быть одним из: {', '.join(LEAVE_SLOT_MODES)}")
+            # Прошедшие дни не трогаем: их записи и слоты — история и основа дашборда
+            today = date_type.today()
+            if date_to < today:
+                return error("Период отпуска уже прошёл")
+            date_from = max(date_from, today)
+
+            spec = session.get(Specialist, int(body["specialist_id"]), with_for_update=True)
+            if not spec:
+                return error("Специалист не найден", status=404)
+
+            cancelled = _cancel_appointments_in_period(session, spec, date_from, date_to)
+
+            # Слоты только что отменённых записей; забронированные слоты остальных записей
+            # (например, уже завершённых сегодня) остаются как есть
+            freed = [(date_type.fromisoformat(c["date"]), time_type.fromisoformat(c["time"])) for c in cancelled]
+            cancelled_slots = tuple_(Schedule.work_date, Schedule.slot_time).in_(freed) if freed else false()
+            in_period = (Schedule.specialist_id == spec.id, Schedule.work_date.between(date_from, date_to))
+            if slot_mode == "delete":
+                # Свободные слоты периода и слоты отменённых записей — одним DELETE
+                slots_affected = session.execute(
+                    delete(Schedule).where(*in_period, or_(Schedule.is_booked.is_(False), cancelled_slots))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            else:
+                # Одним UPDATE снимаем бронь и удержание со слотов отменённых записей
+                slots_affected = session.execute(
+                    update(Schedule).where(*in_period, cancelled_slots)
+                    .values(is_booked=False, hold_token=None, held_until=None)
+                    .execution_options(synchronize_session=False)
+                ).rowcount if freed else 0
+
+            # Сначала отмены, затем schedule.changed — индекс доступности перечитает дни последним
+            _publish_events(session, TOPIC_CANCELLED, cancelled)
+            if slots_affected:
+                _publish_events(session, TOPIC_SCHEDULE_CHANGED, [{
+                    "specialist_id": spec.id, "date_from": date_from.isoformat(), "date_to": date_to.isoformat(),
+                }])
+
+            if body.get("unavailable") and spec.is_available:
+                spec.is_available = False
+                _bump_catalogue_version(session)
+
+            session.commit()
+            logger.info(
+                f"Leave specialist={spec.id} {date_from}..{date_to}: cancelled {len(cancelled)} appointments, "
+                f"{slot_mode} {slots_affected} slots"
+            )
+            return ok({
+                "specialist_id": spec.id,
+                "cancelled_appointments": [c["appointment_id"] for c in cancelled],
+                "slots_" + ("deleted" if slot_mode == "delete" else "released"): slots_affected,
+                "available": spec.is_available,
+            })
+
         # GET — список или слоты
         if method == "GET":
             specialist_id = params.get("specialist_id")
             target_date = params.get("date")
 
+            # Сетки нескольких специалистов (сравнение врачей) одним запросом
+            if params.get("specialist_ids"):
+                try:
+                    ids = list(dict.fromkeys(int(x) for x in params["specialist_ids"].split(",") if x.strip()))
+                except ValueError:
+                    return error("Параметр specialist_ids — список целых чисел через запятую")
+                if not ids:
+                    return error("Параметр specialist_ids — список целых чисел через запятую")
+                if len(ids) > GRID_MAX_SPECIALISTS:
+                    return error(f"Не более {GRID_MAX_SPECIALISTS} специалистов за запрос")
+                try:
+                    if target_date:
+                        date_from = date_to = date_type.fromisoformat(target_date)
+                    else:
+                        date_from = date_type.fromisoformat(params.get("from", ""))
+                        date_to = date_type.fromisoformat(params.get("to", ""))
+                except ValueError:
+                    return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+                if date_to < date_from:
+                    return error("Дата to не может быть раньше from")
+                if (date_to - date_from).days >= GRID_MAX_DAYS:
+                    return error(f"Период не может превышать {GRID_MAX_DAYS} дней")
+
+                grids = _slot_grids(session, ids, date_from, date_to)
+                known = set(session.execute(select(Specialist.id).where(Specialist.id.in_(ids))).scalars())
+                logger.info(f"Slot grids for specialists={ids} {date_from}..{date_to}")
+                return ok({
+                    "from": date_from.isoformat(),
+                    "to": date_to.isoformat(),
+                    "specialists": [{"specialist_id": sid, "days": grids[sid]} for sid in ids if sid in known],
+                    "not_found": [sid for sid in ids if sid not in known],
+                })
+
             # Слоты конкретного специалиста на дату
             if specialist_id and target_date:
                 try:
@@ -60,6 +669,27 @@ def handler(event: dict, context) -> dict:
                 logger.info(f"Slots for specialist={specialist_id} date={target_date}: {len(slots)} found")
                 return ok({"slots": [s.to_dict() for s in slots]})
 
+            # Сетка слотов за период
+            if specialist_id and (params.get("from") or params.get("to")):
+                try:
+                    date_from = date_type.fromisoformat(params.get("from", ""))
+                    date_to = date_type.fromisoformat(params.get("to", ""))
+                except ValueError:
+                    return error("Неверный формат даты. Ожидается YYYY-MM-DD")
+                if date_to < date_from:
+                    return error("Дата to не может быть раньше from")
+                if (date_to - date_from).days >= GRID_MAX_DAYS:
+                    return error(f"Период не может превышать {GRID_MAX_DAYS} дней")
+
+                days = _slot_grid(session, int(specialist_id), date_from, date_to)
+                # Пустая сетка — проверяем, что специалист вообще существует
+                if not any(d["available"] or d["booked"] for d in days):
+                    if not session.get(Specialist, int(specialist_id)):
+                        return error("Специалист не найден", status=404)
+                logger.info(f"Slot grid for specialist={specialist_id} {date_from}..{date_to}")
+                return ok({"specialist_id": int(specialist_id), "from": date_from.isoformat(),
+                           "to": date_to.isoformat(), "days": days})
+
             # Карточка одного специалиста
             if specialist_id:
                 spec = session.get(Specialist, int(specialist_id))
@@ -67,10 +697,18 @@ def handler(event: dict, context) -> dict:
                     return error("Специалист не найден", status=404)
                 return ok({"specialist": spec.to_dict()})
 
+            # Страница каталога с фильтрами
+            if any(params.get(p) for p in CATALOGUE_FILTER_PARAMS):
+                try:
+                    specialists, next_cursor = _catalogue_page(session, params)
+                except ValueError as e:
+                    return error(str(e))
+                logger.info(f"Specialists page: {len(specialists)} records, next_cursor={next_cursor}")
+                return ok({"specialists": [s.to_dict() for s in specialists], "next_cursor": next_cursor})
+
             # Все специалисты
-            specialists = session.query(Specialist).order_by(Specialist.id).all()
-            logger.info(f"Specialists list: {len(specialists)} records")
-            return ok({"specialists": [s.to_dict() for s in specialists]})
+            headers = event.get("headers") or {}
+            return _catalogue_response(session, headers.get("If-None-Match") or headers.get("if-none-match"))
 
         # POST — создать специалиста
         if method == "POST":
@@ -102,6 +740,7 @@ def handler(event: dict, context) -> dict:
                 is_available=bool(body.get("is_available", True)),
             )
             session.add(spec)
+            _bump_catalogue_version(session)
             session.commit()
             session.refresh(spec)
             logger.info(f"Created specialist id={spec.id} name={spec.name}")
@@ -128,6 +767,7 @@ def handler(event: dict, context) -> dict:
                 if field in body:
                     setattr(spec, field, body[field])
 
+            _bump_catalogue_version(session)
             session.commit()
             session.refresh(spec)
             logger.info(f"Updated specialist id={spec.id}")
@@ -0,0 +1,149 @@
+"""
+Генерация слотов расписания из недельных шаблонов.
+
+Шаблоны (schedule_templates) и исключения (schedule_exceptions) разворачиваются
+в строки schedules на горизонт N недель и вставляются пачкой:
+через COPY во временную таблицу (psycopg2) либо multi-row INSERT,
+в обоих случаях с ON CONFLICT DO NOTHING — повторная генерация идемпотентна.
+"""
+import io
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from models import SCHEMA, Schedule, ScheduleException, ScheduleTemplate
+
+INSERT_CHUNK_ROWS = 1000
+MAX_WEEKS = 26
+
+
+def _template_times(tpl: ScheduleTemplate) -> list[time]:
+    """Начала слотов шаблона: слот целиком помещается в [start_time, end_time)."""
+    step = timedelta(minutes=tpl.slot_minutes)
+    day = date.min
+    current = datetime.combine(day, tpl.start_time)
+    end = datetime.combine(day, tpl.end_time)
+    times = []
+    while current + step <= end:
+        times.append(current.time())
+        current += step
+    return times
+
+
+def _blocked(slot: time, slot_minutes: int, exceptions: list[ScheduleException]) -> bool:
+    """Пересекается ли слот с одним из исключений дня (исключение без времени — весь день)."""
+    start = datetime.combine(date.min, slot)
+    end = start + timedelta(minutes=slot_minutes)
+    for exc in exceptions:
+        if exc.start_time is None or exc.end_time is None:
+            return True
+        if start < datetime.combine(date.min, exc.end_time) and datetime.combine(date.min, exc.start_time) < end:
+            return True
+    return False
+
+
+def expand_slots(templates: list[ScheduleTemplate], exceptions: list[ScheduleException],
+                 date_from: date, date_to: date):
+    """Разворачивает шаблоны в (specialist_id, work_date, slot_time) за период."""
+    by_weekday: dict[tuple[int, int], list[ScheduleTemplate]] = {}
+    for tpl in templates:
+        by_weekday.setdefault((tpl.specialist_id, tpl.weekday), []).append(tpl)
+    day_exceptions: dict[tuple[int, date], list[ScheduleException]] = {}
+    for exc in exceptions:
+        day_exceptions.setdefault((exc.specialist_id, exc.work_date), []).append(exc)
+    slot_times = {tpl.id: _template_times(tpl) for tpl in templates}
+    specialist_ids = sorted({tpl.specialist_id for tpl in templates})
+
+    day = date_from
+    while day <= date_to:
+        for sid in specialist_ids:
+            blocked = day_exceptions.get((sid, day), [])
+            for tpl in by_weekday.get((sid, day.weekday()), []):
+                for slot in slot_times[tpl.id]:
+                    if not blocked or not _blocked(slot, tpl.slot_minutes, blocked):
+                        yield sid, day, slot
+        day += timedelta(days=1)
+
+
+def _insert_copy(session, rows) -> list[tuple[int, date, date, int]]:
+    """COPY во временную таблицу и INSERT ... SELECT ... ON CONFLICT DO NOTHING."""
+    with session.connection().connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS schedules_staging "
+            "(specialist_id INTEGER, work_date DATE, slot_time TIME) ON COMMIT DROP"
+        )
+        cursor.execute("TRUNCATE schedules_staging")
+        buf = io.StringIO()
+        for sid, work_date, slot_time in rows:
+            buf.write(f"{sid}\t{work_date.isoformat()}\t{slot_time.strftime('%H:%M')}\n")
+        buf.seek(0)
+        cursor.copy_expert("COPY schedules_staging (specialist_id, work_date, slot_time) FROM STDIN", buf)
+        cursor.execute(f"""
+            WITH inserted AS (
+                INSERT INTO {SCHEMA}.schedules (specialist_id, work_date, slot_time, is_booked)
+                SELECT specialist_id, work_date, slot_time, FALSE FROM schedules_staging
+                ORDER BY specialist_id, work_date, slot_time
+                ON CONFLICT (specialist_id, work_date, slot_time) DO NOTHING
+                RETURNING specialist_id, work_date
+            )
+            SELECT specialist_id, MIN(work_date), MAX(work_date), COUNT(*) FROM inserted GROUP BY specialist_id
+        """)
+        return cursor.fetchall()
+
+
+def _insert_multirow(session, rows) -> list[tuple[int, date, date, int]]:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING пачками по INSERT_CHUNK_ROWS."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    summary: dict[int, list] = {}
+
+    def flush(chunk: list[dict]) -> None:
+        stmt = (
+            insert(Schedule)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=["specialist_id", "work_date", "slot_time"])
+            .returning(Schedule.specialist_id, Schedule.work_date)
+        )
+        for sid, work_date in session.execute(stmt):
+            item = summary.setdefault(sid, [work_date, work_date, 0])
+            item[0], item[1], item[2] = min(item[0], work_date), max(item[1], work_date), item[2] + 1
+
+    chunk = []
+    for sid, work_date, slot_time in rows:
+        chunk.append({"specialist_id": sid, "work_date": work_date, "slot_time": slot_time, "is_booked": False})
+        if len(chunk) >= INSERT_CHUNK_ROWS:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return [(sid, lo, hi, count) for sid, (lo, hi, count) in summary.items()]
+
+
+def generate_slots(session, specialist_ids: list[int] | None, date_from: date, weeks: int) -> list[dict]:
+    """
+    Генерирует слоты по шаблонам на weeks недель начиная с date_from.
+    Возвращает по каждому специалисту число новых слотов и их диапазон дат.
+    """
+    date_to = date_from + timedelta(weeks=weeks) - timedelta(days=1)
+
+    tpl_stmt = select(ScheduleTemplate)
+    exc_stmt = select(ScheduleException).where(ScheduleException.work_date.between(date_from, date_to))
+    if specialist_ids:
+        tpl_stmt = tpl_stmt.where(ScheduleTemplate.specialist_id.in_(specialist_ids))
+        exc_stmt = exc_stmt.where(ScheduleException.specialist_id.in_(specialist_ids))
+    templates = session.execute(tpl_stmt).scalars().all()
+    if not templates:
+        return []
+    exceptions = session.execute(exc_stmt).scalars().all()
+
+    rows = expand_slots(templates, exceptions, date_from, date_to)
+    driver = session.get_bind().dialect.driver
+    inserted = _insert_copy(session, rows) if driver == "psycopg2" else _insert_multirow(session, rows)
+    return [
+        {"specialist_id": sid, "date_from": lo.isoformat(), "date_to": hi.isoformat(), "inserted": count}
+        for sid, lo, hi, count in sorted(inserted)
+    ]
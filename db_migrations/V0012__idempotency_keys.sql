@@ -0,0 +1,11 @@
+CREATE TABLE t_p60955846_expert_appointment_s.idempotency_keys (
+    id SERIAL PRIMARY KEY,
+    key VARCHAR(255) NOT NULL UNIQUE,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INTEGER NOT NULL,
+    response_body TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_idempotency_keys_expires_at ON t_p60955846_expert_appointment_s.idempotency_keys(expires_at);
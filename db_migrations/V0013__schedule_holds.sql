@@ -0,0 +1,4 @@
+ALTER TABLE t_p60955846_expert_appointment_s.schedules ADD COLUMN hold_token VARCHAR(64);
+ALTER TABLE t_p60955846_expert_appointment_s.schedules ADD COLUMN held_until TIMESTAMP;
+
+CREATE INDEX idx_schedules_held_until ON t_p60955846_expert_appointment_s.schedules(held_until) WHERE held_until IS NOT NULL;
@@ -0,0 +1,112 @@
+-- Помесячное RANGE-партиционирование appointments по appointment_date.
+-- PK партиционированной таблицы обязан включать ключ партиции, поэтому
+-- внешний ключ notifications.appointment_id заменяется обычным индексом.
+
+ALTER TABLE t_p60955846_expert_appointment_s.notifications DROP CONSTRAINT IF EXISTS notifications_appointment_id_fkey;
+CREATE INDEX idx_notifications_appointment_id ON t_p60955846_expert_appointment_s.notifications(appointment_id);
+
+ALTER TABLE t_p60955846_expert_appointment_s.appointments RENAME TO appointments_legacy;
+ALTER INDEX t_p60955846_expert_appointment_s.appointments_pkey RENAME TO appointments_legacy_pkey;
+
+CREATE TABLE t_p60955846_expert_appointment_s.appointments (
+    id INTEGER NOT NULL DEFAULT nextval('t_p60955846_expert_appointment_s.appointments_id_seq'),
+    specialist_id INTEGER REFERENCES t_p60955846_expert_appointment_s.specialists(id),
+    patient_name VARCHAR(200) NOT NULL,
+    patient_phone VARCHAR(50) NOT NULL,
+    patient_comment TEXT,
+    appointment_date DATE NOT NULL,
+    appointment_time TIME NOT NULL,
+    status VARCHAR(30) DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (id, appointment_date)
+) PARTITION BY RANGE (appointment_date);
+
+ALTER SEQUENCE t_p60955846_expert_appointment_s.appointments_id_seq OWNED BY t_p60955846_expert_appointment_s.appointments.id;
+
+-- Страховочная партиция для дат вне созданных месяцев
+CREATE TABLE t_p60955846_expert_appointment_s.appointments_default
+    PARTITION OF t_p60955846_expert_appointment_s.appointments DEFAULT;
+
+CREATE INDEX idx_appointments_date_time ON t_p60955846_expert_appointment_s.appointments(appointment_date, appointment_time);
+CREATE INDEX idx_appointments_specialist_date ON t_p60955846_expert_appointment_s.appointments(specialist_id, appointment_date, appointment_time);
+
+-- Создаёт месячные партиции от from_month до текущего месяца + months_ahead.
+-- Строки, успевшие попасть в default-партицию, переносятся в новую партицию.
+CREATE OR REPLACE FUNCTION t_p60955846_expert_appointment_s.ensure_appointment_partitions(
+    months_ahead INTEGER DEFAULT 3,
+    from_month DATE DEFAULT NULL
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    m DATE := date_trunc('month', COALESCE(from_month, CURRENT_DATE))::date;
+    last_m DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::date;
+    next_m DATE;
+    part TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE m <= last_m LOOP
+        next_m := (m + INTERVAL '1 month')::date;
+        part := 'appointments_' || to_char(m, 'YYYY_MM');
+        IF to_regclass('t_p60955846_expert_appointment_s.' || part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE t_p60955846_expert_appointment_s.%I (LIKE t_p60955846_expert_appointment_s.appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                part);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM t_p60955846_expert_appointment_s.appointments_default '
+                'WHERE appointment_date >= %L AND appointment_date < %L RETURNING *) '
+                'INSERT INTO t_p60955846_expert_appointment_s.%I SELECT * FROM moved',
+                m, next_m, part);
+            EXECUTE format(
+                'ALTER TABLE t_p60955846_expert_appointment_s.appointments ATTACH PARTITION t_p60955846_expert_appointment_s.%I FOR VALUES FROM (%L) TO (%L)',
+                part, m, next_m);
+            created := created + 1;
+        END IF;
+        m := next_m;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- Холодное хранилище для отработанных месяцев
+CREATE TABLE t_p60955846_expert_appointment_s.appointments_archive (
+    LIKE t_p60955846_expert_appointment_s.appointments INCLUDING DEFAULTS,
+    archived_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX idx_appointments_archive_date ON t_p60955846_expert_appointment_s.appointments_archive(appointment_date);
+
+-- Отсоединяет месячные партиции старше before_month, переносит строки в appointments_archive
+-- и удаляет партицию. Рабочий набор appointments остаётся в пределах актуальных месяцев.
+CREATE OR REPLACE FUNCTION t_p60955846_expert_appointment_s.archive_appointment_partitions(
+    before_month DATE
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    part TEXT;
+    archived INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 't_p60955846_expert_appointment_s.appointments'::regclass
+          AND c.relname ~ '^appointments_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substr(c.relname, 14), 'YYYY_MM') < date_trunc('month', before_month)
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE t_p60955846_expert_appointment_s.appointments DETACH PARTITION t_p60955846_expert_appointment_s.%I', part);
+        EXECUTE format(
+            'INSERT INTO t_p60955846_expert_appointment_s.appointments_archive '
+            'SELECT *, NOW() FROM t_p60955846_expert_appointment_s.%I', part);
+        EXECUTE format('DROP TABLE t_p60955846_expert_appointment_s.%I', part);
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END $$;
+
+SELECT t_p60955846_expert_appointment_s.ensure_appointment_partitions(
+    3, (SELECT MIN(appointment_date) FROM t_p60955846_expert_appointment_s.appointments_legacy)
+);
+
+INSERT INTO t_p60955846_expert_appointment_s.appointments
+    (id, specialist_id, patient_name, patient_phone, patient_comment, appointment_date, appointment_time, status, created_at)
+SELECT id, specialist_id, patient_name, patient_phone, patient_comment, appointment_date, appointment_time, status, created_at
+FROM t_p60955846_expert_appointment_s.appointments_legacy;
+
+DROP TABLE t_p60955846_expert_appointment_s.appointments_legacy;
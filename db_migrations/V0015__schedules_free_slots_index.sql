@@ -0,0 +1,3 @@
+CREATE INDEX idx_schedules_free_date_time
+    ON t_p60955846_expert_appointment_s.schedules(work_date, slot_time, specialist_id)
+    WHERE is_booked = FALSE;
@@ -0,0 +1,24 @@
+CREATE TABLE t_p60955846_expert_appointment_s.schedule_templates (
+    id SERIAL PRIMARY KEY,
+    specialist_id INTEGER NOT NULL REFERENCES t_p60955846_expert_appointment_s.specialists(id),
+    weekday SMALLINT NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    slot_minutes INTEGER NOT NULL DEFAULT 30 CHECK (slot_minutes > 0),
+    created_at TIMESTAMP DEFAULT NOW(),
+    CHECK (end_time > start_time)
+);
+
+CREATE INDEX idx_schedule_templates_specialist ON t_p60955846_expert_appointment_s.schedule_templates(specialist_id, weekday);
+
+CREATE TABLE t_p60955846_expert_appointment_s.schedule_exceptions (
+    id SERIAL PRIMARY KEY,
+    specialist_id INTEGER NOT NULL REFERENCES t_p60955846_expert_appointment_s.specialists(id),
+    work_date DATE NOT NULL,
+    start_time TIME,
+    end_time TIME,
+    reason VARCHAR(200),
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_schedule_exceptions_specialist_date ON t_p60955846_expert_appointment_s.schedule_exceptions(specialist_id, work_date);
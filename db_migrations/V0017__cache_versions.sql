@@ -0,0 +1,7 @@
+CREATE TABLE t_p60955846_expert_appointment_s.cache_versions (
+    name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO t_p60955846_expert_appointment_s.cache_versions (name, version) VALUES ('specialists', 1);
@@ -0,0 +1,6 @@
+CREATE INDEX idx_specialists_specialty_rating
+    ON t_p60955846_expert_appointment_s.specialists(lower(specialty), rating DESC, id DESC);
+CREATE INDEX idx_specialists_specialty_price
+    ON t_p60955846_expert_appointment_s.specialists(lower(specialty), price, id);
+CREATE INDEX idx_specialists_rating ON t_p60955846_expert_appointment_s.specialists(rating DESC, id DESC);
+CREATE INDEX idx_specialists_price ON t_p60955846_expert_appointment_s.specialists(price, id);
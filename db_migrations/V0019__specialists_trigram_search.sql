@@ -0,0 +1,6 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_specialists_name_trgm
+    ON t_p60955846_expert_appointment_s.specialists USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_specialists_specialty_trgm
+    ON t_p60955846_expert_appointment_s.specialists USING GIN (specialty gin_trgm_ops);
@@ -0,0 +1,22 @@
+CREATE TABLE t_p60955846_expert_appointment_s.waitlist (
+    id SERIAL PRIMARY KEY,
+    specialist_id INTEGER NOT NULL REFERENCES t_p60955846_expert_appointment_s.specialists(id),
+    patient_name VARCHAR(200) NOT NULL,
+    patient_phone VARCHAR(50) NOT NULL,
+    date_from DATE NOT NULL,
+    date_to DATE NOT NULL,
+    time_from TIME,
+    time_to TIME,
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    offered_date DATE,
+    offered_time TIME,
+    offered_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW(),
+    CHECK (date_to >= date_from)
+);
+
+-- Поиск кандидата на освободившийся слот: только активные заявки специалиста,
+-- окно дат с началом не позже даты слота, в порядке очереди
+CREATE INDEX idx_waitlist_active_match
+    ON t_p60955846_expert_appointment_s.waitlist(specialist_id, date_from, created_at)
+    WHERE status = 'active';
@@ -0,0 +1,7 @@
+CREATE TABLE t_p60955846_expert_appointment_s.revoked_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_revoked_tokens_expires_at ON t_p60955846_expert_appointment_s.revoked_tokens(expires_at);
@@ -0,0 +1 @@
+CREATE INDEX idx_sessions_expires_at ON t_p60955846_expert_appointment_s.sessions(expires_at);
@@ -0,0 +1,6 @@
+CREATE TABLE t_p60955846_expert_appointment_s.auth_rate_limits (
+    key VARCHAR(300) PRIMARY KEY,
+    window_start BIGINT NOT NULL,
+    prev_count INTEGER NOT NULL DEFAULT 0,
+    curr_count INTEGER NOT NULL DEFAULT 0
+);
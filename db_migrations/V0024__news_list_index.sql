@@ -0,0 +1,4 @@
+CREATE INDEX idx_news_published_at
+    ON t_p60955846_expert_appointment_s.news(is_published, published_at DESC, id DESC);
+
+INSERT INTO t_p60955846_expert_appointment_s.cache_versions (name, version) VALUES ('news', 1);
@@ -0,0 +1,7 @@
+ALTER TABLE t_p60955846_expert_appointment_s.news
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(content, '')), 'B')
+    ) STORED;
+
+CREATE INDEX idx_news_search_vector ON t_p60955846_expert_appointment_s.news USING GIN (search_vector);
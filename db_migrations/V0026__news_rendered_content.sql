@@ -0,0 +1,3 @@
+ALTER TABLE t_p60955846_expert_appointment_s.news
+    ADD COLUMN content_html TEXT,
+    ADD COLUMN reading_minutes INTEGER;
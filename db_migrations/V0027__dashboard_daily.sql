@@ -0,0 +1,25 @@
+CREATE TABLE t_p60955846_expert_appointment_s.dashboard_daily (
+    specialist_id INTEGER NOT NULL REFERENCES t_p60955846_expert_appointment_s.specialists(id),
+    day DATE NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0,
+    confirmed INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    slots_total INTEGER NOT NULL DEFAULT 0,
+    slots_booked INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (specialist_id, day)
+);
+
+-- Дашборд читает по диапазону дней для всех специалистов
+CREATE INDEX idx_dashboard_daily_day ON t_p60955846_expert_appointment_s.dashboard_daily(day);
+
+-- Позиция чтения очереди events для потребителей, которые не используют events.status
+CREATE TABLE t_p60955846_expert_appointment_s.consumer_offsets (
+    consumer VARCHAR(100) PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO t_p60955846_expert_appointment_s.consumer_offsets (consumer, last_event_id) VALUES ('dashboard', 0);
@@ -0,0 +1,75 @@
+-- Создание и архивация партиций идут под общей транзакционной advisory-блокировкой:
+-- два инстанса, впервые за день вызвавшие ensure_appointment_partitions, больше
+-- не пытаются создать/присоединить одну и ту же партицию одновременно —
+-- второй дождётся первого и увидит партицию уже созданной.
+
+CREATE OR REPLACE FUNCTION t_p60955846_expert_appointment_s.ensure_appointment_partitions(
+    months_ahead INTEGER DEFAULT 3,
+    from_month DATE DEFAULT NULL
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    m DATE := date_trunc('month', COALESCE(from_month, CURRENT_DATE))::date;
+    last_m DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::date;
+    next_m DATE;
+    part TEXT;
+    created INTEGER := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('t_p60955846_expert_appointment_s.appointments_partitions'));
+    WHILE m <= last_m LOOP
+        next_m := (m + INTERVAL '1 month')::date;
+        part := 'appointments_' || to_char(m, 'YYYY_MM');
+        IF to_regclass('t_p60955846_expert_appointment_s.' || part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE t_p60955846_expert_appointment_s.%I (LIKE t_p60955846_expert_appointment_s.appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                part);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM t_p60955846_expert_appointment_s.appointments_default '
+                'WHERE appointment_date >= %L AND appointment_date < %L RETURNING *) '
+                'INSERT INTO t_p60955846_expert_appointment_s.%I SELECT * FROM moved',
+                m, next_m, part);
+            EXECUTE format(
+                'ALTER TABLE t_p60955846_expert_appointment_s.appointments ATTACH PARTITION t_p60955846_expert_appointment_s.%I FOR VALUES FROM (%L) TO (%L)',
+                part, m, next_m);
+            created := created + 1;
+        END IF;
+        m := next_m;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- Кроме месячных партиций старше before_month в архив уходят и строки
+-- default-партиции с датами до before_month (месяцы, для которых партиция не создавалась).
+CREATE OR REPLACE FUNCTION t_p60955846_expert_appointment_s.archive_appointment_partitions(
+    before_month DATE
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    part TEXT;
+    archived INTEGER := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('t_p60955846_expert_appointment_s.appointments_partitions'));
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 't_p60955846_expert_appointment_s.appointments'::regclass
+          AND c.relname ~ '^appointments_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substr(c.relname, 14), 'YYYY_MM') < date_trunc('month', before_month)
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE t_p60955846_expert_appointment_s.appointments DETACH PARTITION t_p60955846_expert_appointment_s.%I', part);
+        EXECUTE format(
+            'INSERT INTO t_p60955846_expert_appointment_s.appointments_archive '
+            'SELECT *, NOW() FROM t_p60955846_expert_appointment_s.%I', part);
+        EXECUTE format('DROP TABLE t_p60955846_expert_appointment_s.%I', part);
+        archived := archived + 1;
+    END LOOP;
+
+    WITH moved AS (
+        DELETE FROM t_p60955846_expert_appointment_s.appointments_default
+        WHERE appointment_date < date_trunc('month', before_month)
+        RETURNING *
+    )
+    INSERT INTO t_p60955846_expert_appointment_s.appointments_archive SELECT *, NOW() FROM moved;
+
+    RETURN archived;
+END $$;
@@ -0,0 +1,8 @@
+-- first_available фильтрует и по held_until (не удерживается ли слот) — колонка
+-- добавлена в INCLUDE, чтобы проверка шла по индексу без обращения к строкам таблицы
+DROP INDEX IF EXISTS t_p60955846_expert_appointment_s.idx_schedules_free_date_time;
+
+CREATE INDEX idx_schedules_free_date_time
+    ON t_p60955846_expert_appointment_s.schedules(work_date, slot_time, specialist_id)
+    INCLUDE (held_until)
+    WHERE is_booked = FALSE;
@@ -0,0 +1,4 @@
+-- id событий, ещё не видимых потребителю при чтении (транзакция публикации не закоммичена),
+-- перечитываются на следующих проходах: id дыры → время, когда её заметили (unix)
+ALTER TABLE t_p60955846_expert_appointment_s.consumer_offsets
+    ADD COLUMN gaps JSONB NOT NULL DEFAULT '{}';
@@ -20,6 +20,21 @@ export interface TimeSlot {
   status: "available" | "booked";
 }
 
+export interface SlotGridDay {
+  date: string;
+  available: string[];
+  booked: string[];
+}
+
+export interface FreeSlot {
+  specialist_id: number;
+  date: string;
+  time: string;
+  doctor: string;
+  specialty: string;
+  emoji: string;
+}
+
 export interface Appointment {
   id: number;
   patient: string;
@@ -33,6 +48,21 @@ export interface Appointment {
   comment?: string;
 }
 
+export interface DashboardRow {
+  date: string;
+  specialist_id: number;
+  doctor: string;
+  specialty: string;
+  pending: number;
+  confirmed: number;
+  completed: number;
+  cancelled: number;
+  revenue: number;
+  slots_total: number;
+  slots_booked: number;
+  occupancy: number | null;
+}
+
 export interface Notification {
   id: number;
   type: string;
@@ -95,12 +125,49 @@ export const api = {
     return data.specialists ?? [];
   },
 
+  async getSpecialistsPage(filters: { specialty?: string; min_price?: number; max_price?: number; available?: boolean; sort?: "rating" | "price"; limit?: number; cursor?: string } = {}): Promise<{ specialists: Specialist[]; next_cursor: string | null }> {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([k, v]) => v !== undefined && v !== "" && params.set(k, String(v)));
+    if (!params.toString()) params.set("limit", "20");
+    const res = await fetch(`${SPECIALISTS_URL}?${params}`);
+    const data = await res.json();
+    return { specialists: data.specialists ?? [], next_cursor: data.next_cursor ?? null };
+  },
+
+  async searchSpecialists(q: string, limit = 10): Promise<(Specialist & { score: number })[]> {
+    const params = new URLSearchParams({ action: "search", q, limit: String(limit) });
+    const res = await fetch(`${SPECIALISTS_URL}?${params}`);
+    const data = await res.json();
+    return data.specialists ?? [];
+  },
+
   async getSlots(specialistId: number, date: string): Promise<TimeSlot[]> {
     const res = await fetch(`${SPECIALISTS_URL}?specialist_id=${specialistId}&date=${date}`);
     const data = await res.json();
     return data.slots ?? [];
   },
 
+  async getSlotGrid(specialistId: number, from: string, to: string): Promise<SlotGridDay[]> {
+    const res = await fetch(`${SPECIALISTS_URL}?specialist_id=${specialistId}&from=${from}&to=${to}`);
+    const data = await res.json();
+    return data.days ?? [];
+  },
+
+  async getSlotGrids(specialistIds: number[], from: string, to: string = from): Promise<{ specialist_id: number; days: SlotGridDay[] }[]> {
+    const params = new URLSearchParams({ specialist_ids: specialistIds.join(","), from, to });
+    const res = await fetch(`${SPECIALISTS_URL}?${params}`);
+    const data = await res.json();
+    return data.specialists ?? [];
+  },
+
+  async findFirstAvailable(specialty: string, opts: { from?: string; to?: string; time_from?: string; time_to?: string; limit?: number } = {}): Promise<FreeSlot[]> {
+    const params = new URLSearchParams({ action: "first_available", specialty });
+    Object.entries(opts).forEach(([k, v]) => v !== undefined && params.set(k, String(v)));
+    const res = await fetch(`${SPECIALISTS_URL}?${params}`);
+    const data = await res.json();
+    return data.slots ?? [];
+  },
+
   // APPOINTMENTS
   async getAppointments(date?: string): Promise<{ appointments: Appointment[] }> {
     const url = date ? `${APPOINTMENTS_URL}?date=${date}` : APPOINTMENTS_URL;
@@ -110,20 +177,80 @@ export const api = {
 
   async createAppointment(payload: {
     specialist_id: number; patient_name: string; patient_phone: string;
-    patient_comment?: string; date: string; time: string;
-  }): Promise<{ id: number; ok: boolean }> {
-    const res = await fetch(APPOINTMENTS_URL, {
-      method: "POST", headers: authHeaders(), body: JSON.stringify(payload),
+    patient_comment?: string; date: string; time: string; hold_token?: string;
+  }, idempotencyKey: string = crypto.randomUUID()): Promise<{ id: number; ok: boolean }> {
+    // Повторы после сетевой ошибки идут с тем же ключом — сервер вернёт сохранённый ответ
+    const body = JSON.stringify(payload);
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const res = await fetch(APPOINTMENTS_URL, {
+          method: "POST", headers: { ...authHeaders(), "Idempotency-Key": idempotencyKey }, body,
+        });
+        return res.json();
+      } catch (e) {
+        if (attempt >= 2) throw e;
+      }
+    }
+  },
+
+  async exportAppointments(from: string, to: string, format: "csv" | "ndjson" = "csv", specialistId?: number): Promise<Blob> {
+    // Сервер отдаёт выгрузку страницами, продолжение — по заголовку X-Next-Cursor
+    const parts: string[] = [];
+    let cursor: string | null = null;
+    do {
+      const params = new URLSearchParams({ action: "export", from, to, format });
+      if (specialistId) params.set("specialist_id", String(specialistId));
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${APPOINTMENTS_URL}?${params}`, { headers: authHeaders() });
+      parts.push(await res.text());
+      cursor = res.headers.get("X-Next-Cursor");
+    } while (cursor);
+    return new Blob(parts, { type: format === "csv" ? "text/csv" : "application/x-ndjson" });
+  },
+
+  async joinWaitlist(data: { specialist_id: number; patient_name: string; patient_phone: string; date_from: string; date_to: string; time_from?: string; time_to?: string }): Promise<{ waitlist: { id: number; status: string } }> {
+    const res = await fetch(`${APPOINTMENTS_URL}?action=waitlist`, {
+      method: "POST", headers: authHeaders(), body: JSON.stringify(data),
     });
     return res.json();
   },
 
+  async leaveWaitlist(id: number): Promise<void> {
+    await fetch(`${APPOINTMENTS_URL}?action=waitlist&id=${id}`, { method: "DELETE", headers: authHeaders() });
+  },
+
+  async holdSlot(specialistId: number, date: string, time: string): Promise<{ hold_token: string; expires_at: string } | null> {
+    const res = await fetch(`${APPOINTMENTS_URL}?action=hold`, {
+      method: "POST", headers: authHeaders(), body: JSON.stringify({ specialist_id: specialistId, date, time }),
+    });
+    if (res.status === 409) return null;
+    return res.json();
+  },
+
+  async releaseHold(token: string): Promise<void> {
+    await fetch(`${APPOINTMENTS_URL}?action=hold&token=${token}`, { method: "DELETE", headers: authHeaders() });
+  },
+
   async updateAppointmentStatus(id: number, status: string): Promise<void> {
     await fetch(`${APPOINTMENTS_URL}?id=${id}`, {
       method: "PUT", headers: authHeaders(), body: JSON.stringify({ status }),
     });
   },
 
+  async updateAppointmentsStatus(ids: number[], status: string): Promise<{ updated: number[]; skipped: number[] }> {
+    const res = await fetch(APPOINTMENTS_URL, {
+      method: "PUT", headers: authHeaders(), body: JSON.stringify({ ids, status }),
+    });
+    return res.json();
+  },
+
+  async getDashboard(from: string, to: string = from, specialistId?: number): Promise<{ rows: DashboardRow[]; totals: Omit<DashboardRow, "date" | "specialist_id" | "doctor" | "specialty"> }> {
+    const params = new URLSearchParams({ action: "dashboard", from, to });
+    if (specialistId) params.set("specialist_id", String(specialistId));
+    const res = await fetch(`${APPOINTMENTS_URL}?${params}`, { headers: authHeaders() });
+    return res.json();
+  },
+
   // NOTIFICATIONS
   async getNotifications(): Promise<{ notifications: Notification[]; unread: number }> {
     const res = await fetch(NOTIFICATIONS_URL);
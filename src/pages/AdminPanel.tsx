@@ -33,6 +33,7 @@ export default function AdminPanel() {
   const [appointments, setAppointments] = useState<Appointment[]>([]);
   const [loading, setLoading] = useState(true);
   const [updating, setUpdating] = useState<number | null>(null);
+  const [occupancy, setOccupancy] = useState<number | null>(null);
 
   useEffect(() => {
     if (view !== "schedule") return;
@@ -44,6 +45,9 @@ export default function AdminPanel() {
       setAppointments(myAppointments);
       setLoading(false);
     });
+    api.getDashboard(selectedDate, selectedDate, user?.specialist_id ?? undefined)
+      .then(data => setOccupancy(data.totals?.occupancy ?? null))
+      .catch(() => setOccupancy(null));
   }, [selectedDate, view, user]);
 
   const changeStatus = async (id: number, status: string) => {
@@ -110,11 +114,12 @@ export default function AdminPanel() {
             </div>
 
             {/* Stats */}
-            <div className="grid grid-cols-3 gap-4 mb-6">
+            <div className="grid grid-cols-2 sm:grid-cols-4 gap-4 mb-6">
               {[
                 { label: "Всего на день", value: appointments.length, icon: "Calendar", color: "text-primary" },
                 { label: "Ожидают", value: pending, icon: "Clock", color: "text-yellow-400" },
                 { label: "Подтверждено", value: confirmed, icon: "CheckCircle", color: "text-emerald-400" },
+                { label: "Загрузка", value: occupancy === null ? "—" : `${Math.round(occupancy * 100)}%`, icon: "Gauge", color: "text-cyan-400" },
               ].map(s => (
                 <div key={s.label} className="gradient-card border border-border rounded-2xl p-4">
                   <Icon name={s.icon as "Calendar"} size={18} className={`${s.color} mb-2`} />
@@ -273,6 +278,7 @@ function NotificationsView() {
     reminder: { icon: "Bell", color: "text-yellow-400" },
     confirm: { icon: "CheckCircle", color: "text-emerald-400" },
     cancel: { icon: "XCircle", color: "text-red-400" },
+    waitlist: { icon: "CalendarClock", color: "text-sky-400" },
   };
 
   return (
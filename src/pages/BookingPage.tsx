@@ -29,6 +29,8 @@ export default function BookingPage() {
   const [slots, setSlots] = useState<TimeSlot[]>([]);
   const [loadingSlots, setLoadingSlots] = useState(false);
   const [selectedTime, setSelectedTime] = useState<string | null>(null);
+  const [holdToken, setHoldToken] = useState<string | null>(null);
+  const [holding, setHolding] = useState(false);
   const [form, setForm] = useState({ name: user?.full_name ?? "", phone: user?.phone ?? "", comment: "" });
   const [submitting, setSubmitting] = useState(false);
   const [done, setDone] = useState(false);
@@ -54,6 +56,23 @@ export default function BookingPage() {
     }
   }, [selected, selectedDate]);
 
+  const holdAndContinue = async () => {
+    if (!selected || !selectedTime) return;
+    setHolding(true);
+    if (holdToken) await api.releaseHold(holdToken);
+    const hold = await api.holdSlot(selected, selectedDate, selectedTime);
+    setHolding(false);
+    if (!hold) {
+      // Слот успели занять — перезагружаем сетку
+      setHoldToken(null);
+      setSelectedTime(null);
+      api.getSlots(selected, selectedDate).then(setSlots);
+      return;
+    }
+    setHoldToken(hold.hold_token);
+    setStep(3);
+  };
+
   const handleSubmit = async () => {
     if (!selected || !selectedTime) return;
     setSubmitting(true);
@@ -64,7 +83,9 @@ export default function BookingPage() {
       patient_comment: form.comment,
       date: selectedDate,
       time: selectedTime,
+      hold_token: holdToken ?? undefined,
     });
+    setHoldToken(null);
     setSubmitting(false);
     setDone(true);
   };
@@ -248,8 +269,8 @@ export default function BookingPage() {
             <div className="flex gap-3">
               <button onClick={() => setStep(1)} className="flex-1 py-3.5 rounded-xl border border-border text-foreground font-medium hover:bg-muted transition-colors">Назад</button>
               <button
-                onClick={() => selectedTime && setStep(3)}
-                disabled={!selectedTime}
+                onClick={holdAndContinue}
+                disabled={!selectedTime || holding}
                 className="flex-[2] gradient-primary text-primary-foreground font-semibold py-3.5 rounded-xl btn-glow transition-all duration-200 disabled:opacity-40 disabled:cursor-not-allowed flex items-center justify-center gap-2"
               >
                 Далее — ваши данные <Icon name="ArrowRight" size={16} />
@@ -9,6 +9,7 @@ interface NewsItem {
   id: number;
   title: string;
   preview: string;
+  reading_minutes: number | null;
   published_at: string;
 }
 
@@ -232,6 +233,12 @@ export default function HomePage({ onBook }: HomePageProps) {
                   </CardHeader>
                   <CardContent className="pt-0">
                     <p className="text-sm text-muted-foreground">{item.preview}</p>
+                    {item.reading_minutes && (
+                      <p className="text-xs text-muted-foreground mt-2 flex items-center gap-1">
+                        <Icon name="Clock" size={12} />
+                        {item.reading_minutes} мин чтения
+                      </p>
+                    )}
                   </CardContent>
                 </Card>
               ))}
@@ -13,6 +13,7 @@ const typeIcons: Record<string, { icon: string; color: string }> = {
   reminder: { icon: "Bell", color: "text-yellow-400" },
   confirm: { icon: "CheckCircle", color: "text-emerald-400" },
   cancel: { icon: "XCircle", color: "text-red-400" },
+  waitlist: { icon: "CalendarClock", color: "text-sky-400" },
 };
 
 function formatTime(ts: string) {